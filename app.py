@@ -1,35 +1,37 @@
+import time
+_startup_started = time.perf_counter()
+
 import os
-from flask import Flask, render_template, request, jsonify, Response
+from flask import Flask, render_template, request, jsonify, Response, url_for
 from werkzeug.utils import secure_filename
-import requests
+from werkzeug.exceptions import RequestEntityTooLarge
 from dotenv import load_dotenv
 import json
 import tempfile
 import logging
-import nltk
-from services.video_processor import extract_video_content
+from services.video_processor import extract_video_transcript, TRANSCRIPTION_FAILED_MESSAGE
+from services.summarizer import StreamingSummarizer
+from services.text_analysis import TextAnalysis
 from services.content_discovery import get_related_youtube_videos, search_related_blogs
-from services.content_generator import generate_description, generate_tags
+from services.content_generator import generate_description, generate_tags, extract_keywords, build_search_query
+from services.job_queue import submit_job, get_job, get_progress_reporter, wait_for_events, JobQueueFull
+from services.transcript_cache import get_cached_content, store_content, hash_file
+from services.pipeline import Stage, run_stages, record_stage_metric
+from services.metrics import render_metrics, PIPELINE_STAGE_SECONDS, UPLOADED_BYTES
+from services.upload_ingest import IngestRequest, claim_upload, ingest_stream
+from services.upload_sessions import create_session, get_session, write_chunk, mark_session, UploadSessionError
+from services.template_store import seed_template, get_template, set_template, render_with_tags
+from services.result_store import save_result, get_result, update_result
+from services.preflight import preflight, PreflightError
 from flask_cors import CORS
 import io
 
-# Set NLTK data path to match the one in Dockerfile
-nltk.data.path.append('/app/nltk_data')
-
 # Load environment variables (optional now)
 load_dotenv()
 
-# Download NLTK data at startup to avoid runtime errors
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    # This should not be needed since we've pre-downloaded in Dockerfile
-    # but keeping as fallback for local development
-    nltk.download('punkt')
-    nltk.download('stopwords')
-
 app = Flask(__name__)
+# Uploads are written to their temp file and hashed while the request body is parsed
+app.request_class = IngestRequest
 CORS(app)  # Enable CORS for all routes
 
 # Increase max content length to 500MB
@@ -42,6 +44,8 @@ app.config['DEFAULT_DESCRIPTION'] = """
 
 Tags:
 """
+# Initial template, edits are kept in the shared template store
+seed_template('default_description', app.config['DEFAULT_DESCRIPTION'])
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -54,13 +58,242 @@ logger.info(f"Using temporary directory for uploads: {app.config['UPLOAD_FOLDER'
 YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
 SERPAPI_KEY = os.getenv('SERPAPI_API_KEY')
 
+# Seconds each discovery search may take before the pipeline continues without it
+DISCOVERY_TIMEOUT = float(os.getenv('DISCOVERY_TIMEOUT', 30))
+# Length budget of the keyword query sent to the related-content searches
+SEARCH_QUERY_MAX_CHARS = int(os.getenv('SEARCH_QUERY_MAX_CHARS', 80))
+# Number of short tags generated for each video
+TAG_COUNT = int(os.getenv('TAG_COUNT', 10))
+# Seconds between keep-alive comments on an idle progress stream
+SSE_KEEPALIVE_SECONDS = 15
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in {'mp4', 'avi', 'mov', 'wmv', 'flv', 'mkv'}
 
+def is_job_mode():
+    """Check whether the client asked for background processing"""
+    return request.values.get('async', '').lower() in {'1', 'true', 'yes'}
+
+def remove_temp_file(path):
+    """Remove a temporary file, logging instead of raising on failure"""
+    try:
+        os.unlink(path)
+        logger.info(f"Cleaned up temporary file: {path}")
+    except Exception as cleanup_error:
+        logger.warning(f"Failed to clean up temporary file: {str(cleanup_error)}")
+
+# Progress event sent when a pipeline stage finishes, with the partial result it carries
+STAGE_EVENTS = {
+    'summary': ('summary_ready', lambda summary: {'video_summary': summary.text}),
+    'youtube_videos': ('youtube_videos_ready', lambda videos: {'youtube_videos': videos}),
+    'blog_posts': ('blog_posts_ready', lambda posts: {'blog_posts': posts}),
+    'tags': ('tags_ready', lambda tags: {'tags': tags}),
+    'description_data': ('descriptions_ready', lambda description_data: {'description_data': description_data}),
+}
+
+def run_video_pipeline(video_path, content_hash=None, progress=None, summary=None, media=None):
+    """
+    Run extraction, discovery and generation for a video saved on disk
+    
+    Args:
+        video_path: Path to the uploaded video file
+        content_hash: SHA-256 of the upload, used to reuse earlier transcripts
+        progress: Optional callable receiving (event, data) as the work advances,
+            defaults to the progress events of the background job running it
+        summary: Optional TextAnalysis of a summary made elsewhere, skips extraction
+        media: Optional preflight result of the video, probed before extraction otherwise
+        
+    Returns:
+        dict: The JSON payload returned to the client
+    """
+    progress = progress or get_progress_reporter()
+    
+    def on_stage_done(name, result, seconds):
+        PIPELINE_STAGE_SECONDS.labels(stage=name).observe(seconds)
+        if progress is not None and name in STAGE_EVENTS:
+            event, partial_result = STAGE_EVENTS[name]
+            progress(event, dict(partial_result(result), stage_seconds=seconds))
+    
+    stages = [
+        # Extract content from video, reusing the transcript of an identical earlier upload
+        Stage('video', lambda: (summary, 'provided') if summary is not None
+              else get_video_summary(video_path, content_hash, progress, media)),
+        Stage('summary', lambda video: video[0], deps=['video']),
+        # Search with a short keyword query instead of the whole summary
+        Stage('search_query', get_search_query, deps=['summary']),
+    ] + discovery_stages() + generation_stages()
+    results, timings, metrics = run_stages(stages, on_stage_done=on_stage_done)
+    
+    # Keep what regenerating the descriptions needs, unless there is nothing to regenerate from
+    result_id = None
+    if results['summary'].text != TRANSCRIPTION_FAILED_MESSAGE:
+        result_id = save_result(results['summary'].text, results['search_query'], results['youtube_videos'],
+                                results['blog_posts'], results['tags'], content_hash)
+    return {
+        'result_id': result_id,
+        'video_summary': results['summary'].text,
+        'search_query': results['search_query'],
+        'youtube_videos': results['youtube_videos'],
+        'blog_posts': results['blog_posts'],
+        'description_data': results['description_data'],
+        'default_description': get_default_description(),
+        'tags': results['tags'],
+        'transcript_cache': results['video'][1],
+        'stage_timings': timings,
+        'stage_metrics': metrics
+    }
+
+def discovery_stages(refresh=False):
+    """Related-content searches for the search_query stage, refresh bypasses the discovery cache"""
+    return [
+        # Get related content (API keys are optional now)
+        Stage('youtube_videos', lambda search_query: get_related_youtube_videos(search_query, YOUTUBE_API_KEY, refresh=refresh),
+              deps=['search_query'], timeout=DISCOVERY_TIMEOUT, default=[]),
+        Stage('blog_posts', lambda search_query: search_related_blogs(search_query, SERPAPI_KEY, refresh=refresh),
+              deps=['search_query'], timeout=DISCOVERY_TIMEOUT, default=[]),
+    ]
+
+def generation_stages():
+    """Keywords, tags and descriptions from the summary and discovery stages"""
+    return [
+        # Keywords only need the summary, so they are extracted while discovery runs
+        Stage('keywords', lambda summary: extract_keywords(summary.text, analysis=summary),
+              deps=['summary'], default=None),
+        Stage('tags', lambda summary, youtube_videos, blog_posts: generate_tags(summary.text, youtube_videos, blog_posts, analysis=summary, max_tags=TAG_COUNT),
+              deps=['summary', 'youtube_videos', 'blog_posts']),
+        Stage('description_data', build_description,
+              deps=['summary', 'keywords', 'youtube_videos', 'blog_posts', 'tags']),
+    ]
+
+def regenerate_result(stored, refresh_discovery=False, search_query=None):
+    """
+    Generate new tags and descriptions for a stored result without touching the video
+    
+    Args:
+        stored: Result from the result store
+        refresh_discovery: Search for related content again instead of reusing the stored results
+        search_query: Optional new query for the searches, implies refresh_discovery
+        
+    Returns:
+        dict: The JSON payload returned to the client
+    """
+    summary = TextAnalysis(stored['summary'])
+    query = search_query or stored['search_query'] or get_search_query(summary)
+    if search_query or refresh_discovery:
+        discovery = discovery_stages(refresh=True)
+    else:
+        discovery = [
+            Stage('youtube_videos', lambda: stored['youtube_videos']),
+            Stage('blog_posts', lambda: stored['blog_posts']),
+        ]
+    stages = [
+        Stage('summary', lambda: summary),
+        Stage('search_query', lambda: query),
+    ] + discovery + generation_stages()
+    results, timings, metrics = run_stages(stages, on_stage_done=lambda name, result, seconds:
+                                           PIPELINE_STAGE_SECONDS.labels(stage=name).observe(seconds))
+    
+    update_result(stored['result_id'], search_query=query, youtube_videos=results['youtube_videos'],
+                  blog_posts=results['blog_posts'], tags=results['tags'])
+    return {
+        'result_id': stored['result_id'],
+        'video_summary': summary.text,
+        'search_query': query,
+        'youtube_videos': results['youtube_videos'],
+        'blog_posts': results['blog_posts'],
+        'description_data': results['description_data'],
+        'default_description': get_default_description(),
+        'tags': results['tags'],
+        'stage_timings': timings,
+        'stage_metrics': metrics
+    }
+
+def build_description(summary, keywords, youtube_videos, blog_posts, tags):
+    """Generate the description options with the short tags added to the default description"""
+    # Add short tags to default description, cached per template version
+    _, enhanced_default_description = render_with_tags('default_description', tags['short_tags'],
+                                                       app.config['DEFAULT_DESCRIPTION'])
+    
+    # Generate description with the enhanced default description
+    return generate_description(
+        summary.text, 
+        youtube_videos, 
+        blog_posts, 
+        enhanced_default_description,
+        top_keywords=keywords,
+        analysis=summary
+    )
+
+def get_default_description():
+    """The current default description, as last saved by any worker"""
+    return get_template('default_description', app.config['DEFAULT_DESCRIPTION'])[1]
+
+def get_search_query(summary):
+    """Build the discovery query from the summary analysis, falling back to the start of the summary"""
+    try:
+        query = build_search_query(summary.text, SEARCH_QUERY_MAX_CHARS, analysis=summary)
+    except Exception as e:
+        logger.warning(f"Failed to build search query, using the summary instead: {e}")
+        query = ''
+    return query or summary.text[:SEARCH_QUERY_MAX_CHARS]
+
+def get_video_summary(video_path, content_hash=None, progress=None, media=None):
+    """
+    Get the summary of a video from the transcript cache or by transcribing it
+    
+    Args:
+        video_path: Path to the uploaded video file
+        content_hash: SHA-256 of the upload, used to reuse earlier transcripts
+        progress: Optional callable receiving extraction and transcription progress
+        media: Optional preflight result, probed here when a transcription is needed
+    
+    Returns:
+        tuple: (TextAnalysis of the summary, cache status) where the status is 'hit', 'miss' or 'disabled'
+    
+    Raises:
+        PreflightError: The video cannot be transcribed
+    """
+    cache_status = 'disabled'
+    if content_hash:
+        cached = get_cached_content(content_hash)
+        if cached:
+            logger.info(f"Transcript cache hit for {content_hash}")
+            return TextAnalysis(cached['summary']), 'hit'
+        cache_status = 'miss'
+    
+    # Check the headers and pick full or sampled transcription before decoding anything
+    media = media or preflight(video_path)
+    record_stage_metric('strategy', media['strategy'])
+    record_stage_metric('media_seconds', media['duration'])
+    
+    # Summarize while the transcript is being recognized
+    summarizer = StreamingSummarizer()
+    transcript, failed_chunks = extract_video_transcript(video_path, on_segment=summarizer.add_segment,
+                                                         on_progress=progress, media=media)
+    if transcript == TRANSCRIPTION_FAILED_MESSAGE or not transcript.strip():
+        # Failed and empty transcriptions are not cached so a retry gets another chance
+        return TextAnalysis(TRANSCRIPTION_FAILED_MESSAGE), cache_status
+    
+    summary = summarizer.summary()
+    if failed_chunks:
+        # Partial transcripts are used but not cached, a retry recognizes the missing chunks
+        record_stage_metric('failed_chunks', failed_chunks)
+    elif content_hash:
+        store_content(content_hash, transcript, summary.text)
+    return summary, cache_status
+
+def process_saved_video(video_path, content_hash=None, media=None):
+    """Run the pipeline for an uploaded file and remove the file afterwards"""
+    try:
+        return run_video_pipeline(video_path, content_hash, media=media)
+    finally:
+        # Clean up the temporary file
+        remove_temp_file(video_path)
+
 @app.route('/')
 def index():
-    return render_template('index.html', default_description=app.config['DEFAULT_DESCRIPTION'])
+    return render_template('index.html', default_description=get_default_description())
 
 @app.route('/process_video', methods=['POST'])
 def process_video():
@@ -71,6 +304,18 @@ def process_video():
         logger.info(f"Request files keys: {list(request.files.keys())}")
         
         if 'video' not in request.files:
+            # A raw request body is accepted too, named by the filename query parameter
+            filename = request.args.get('filename', '')
+            if request.mimetype != 'multipart/form-data' and request.content_length and filename:
+                if not allowed_file(filename):
+                    return jsonify({'error': 'Invalid file format'}), 400
+                temp_file_path, content_hash, size = ingest_stream(
+                    request.stream, suffix=os.path.splitext(filename)[1],
+                    max_bytes=app.config['MAX_CONTENT_LENGTH'], directory=app.config['UPLOAD_FOLDER'])
+                logger.info(f"Saved {size} bytes of raw upload to: {temp_file_path}")
+                UPLOADED_BYTES.labels(route='process_video').inc(size)
+                return start_processing(temp_file_path, content_hash)
+            
             logger.warning("No video file in request")
             return jsonify({'error': 'No video file provided'}), 400
         
@@ -82,71 +327,60 @@ def process_video():
         
         if file and allowed_file(file.filename):
             try:
-                # Create a unique temporary file
-                with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-                    temp_file_path = temp_file.name
-                    # Read and write in chunks to handle large files
-                    chunk_size = 4096  # 4KB chunks
-                    while True:
-                        chunk = file.read(chunk_size)
-                        if not chunk:
-                            break
-                        temp_file.write(chunk)
+                # The upload was streamed to disk and hashed while the form was parsed, take the file over
+                temp_file_path, content_hash, size = claim_upload(
+                    file, max_bytes=app.config['MAX_CONTENT_LENGTH'], directory=app.config['UPLOAD_FOLDER'])
                 
                 logger.info(f"Successfully saved uploaded file to: {temp_file_path}")
-                logger.info(f"File size on disk: {os.path.getsize(temp_file_path)} bytes")
+                logger.info(f"File size on disk: {size} bytes")
+                UPLOADED_BYTES.labels(route='process_video').inc(size)
                 
-                # Extract content from video
-                video_summary = extract_video_content(temp_file_path)
-                
-                # Get related content (API keys are optional now)
-                youtube_videos = get_related_youtube_videos(video_summary, YOUTUBE_API_KEY)
-                blog_posts = search_related_blogs(video_summary, SERPAPI_KEY)
-                
-                # Generate tags first
-                tags = generate_tags(video_summary, youtube_videos, blog_posts)
-                
-                # Add short tags to default description
-                enhanced_default_description = app.config['DEFAULT_DESCRIPTION']
-                for tag in tags['short_tags']:
-                    enhanced_default_description += f"{tag}\n"
-                
-                # Generate description with the enhanced default description
-                description_data = generate_description(
-                    video_summary, 
-                    youtube_videos, 
-                    blog_posts, 
-                    enhanced_default_description
-                )
-                
-                # Clean up the temporary file
-                try:
-                    os.unlink(temp_file_path)
-                    logger.info(f"Cleaned up temporary file: {temp_file_path}")
-                except Exception as cleanup_error:
-                    logger.warning(f"Failed to clean up temporary file: {str(cleanup_error)}")
-                
-                return jsonify({
-                    'video_summary': video_summary,
-                    'youtube_videos': youtube_videos,
-                    'blog_posts': blog_posts,
-                    'description_data': description_data,
-                    'default_description': app.config['DEFAULT_DESCRIPTION'],
-                    'tags': tags
-                })
+                return start_processing(temp_file_path, content_hash)
             
             except Exception as e:
                 logger.exception("Error processing video")
                 return jsonify({'error': str(e), 'error_type': type(e).__name__}), 500
         
         return jsonify({'error': 'Invalid file format'}), 400
+    except RequestEntityTooLarge as e:
+        return jsonify({'error': e.description}), 413
     except Exception as e:
         logger.exception("Unexpected error in process_video endpoint")
         return jsonify({'error': str(e), 'error_type': type(e).__name__, 'route': 'process_video'}), 500
+
+def start_processing(temp_file_path, content_hash):
+    """Process a saved upload now, or queue it when the request asks for job mode"""
+    # Reject files without audio, unreadable or too long ones before queueing or decoding anything
+    try:
+        media = preflight(temp_file_path)
+    except PreflightError as e:
+        remove_temp_file(temp_file_path)
+        return jsonify({'error': str(e)}), e.status
+    
+    # In job mode hand the saved file to the background pool and return at once
+    if is_job_mode():
+        try:
+            job_id = submit_job(process_saved_video, temp_file_path, content_hash, media)
+        except JobQueueFull as queue_error:
+            remove_temp_file(temp_file_path)
+            return jsonify({'error': str(queue_error)}), 503
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': url_for('job_status', job_id=job_id),
+            'events_url': url_for('job_events', job_id=job_id)
+        }), 202
+    
+    return jsonify(process_saved_video(temp_file_path, content_hash, media))
         
 @app.route('/chunk_upload', methods=['POST'])
 def chunk_upload():
-    """Alternative endpoint for handling chunked file uploads"""
+    """
+    Chunked upload with form fields, kept for existing clients
+    
+    Chunks are written at their offsets into one preallocated file, so nothing is concatenated
+    at the end. When the last missing chunk arrives the file is queued for processing.
+    """
     try:
         chunk = request.files.get('chunk')
         chunk_number = int(request.form.get('chunk_number', 0))
@@ -155,60 +389,216 @@ def chunk_upload():
         
         if not chunk or not filename:
             return jsonify({'error': 'Missing chunk or filename'}), 400
-            
-        temp_dir = os.path.join(tempfile.gettempdir(), 'video_chunks')
-        os.makedirs(temp_dir, exist_ok=True)
+        if not allowed_file(filename):
+            return jsonify({'error': 'Invalid file format'}), 400
         
         # Generate a unique session ID based on filename if not provided
         session_id = request.form.get('session_id', secure_filename(filename))
-        chunk_path = os.path.join(temp_dir, f"{session_id}_{chunk_number}")
-        
-        # Save this chunk
-        chunk.save(chunk_path)
-        
-        # If this is the last chunk, combine all chunks
-        if chunk_number == total_chunks - 1:
-            final_path = os.path.join(tempfile.gettempdir(), secure_filename(filename))
-            with open(final_path, 'wb') as outfile:
-                # Combine all chunks
-                for i in range(total_chunks):
-                    chunk_file = os.path.join(temp_dir, f"{session_id}_{i}")
-                    if os.path.exists(chunk_file):
-                        with open(chunk_file, 'rb') as infile:
-                            outfile.write(infile.read())
-                        # Clean up chunk
-                        os.unlink(chunk_file)
-            
-            # Now process the complete file (implement the processing logic here)
-            # For now, just return success
-            return jsonify({
-                'success': True,
-                'message': 'File uploaded successfully',
-                'path': final_path
-            })
-        
-        # Not the last chunk, just acknowledge receipt
-        return jsonify({
-            'success': True,
-            'message': f'Chunk {chunk_number + 1}/{total_chunks} received'
-        })
-        
+        create_session(filename, total_chunks,
+                       chunk_size=request.form.get('chunk_size', type=int),
+                       total_size=request.form.get('total_size', type=int),
+                       session_id=session_id,
+                       # These clients send chunk 0 first, so it begins a new upload under the same name
+                       restart=chunk_number == 0)
+        return store_chunk(session_id, chunk_number, chunk.stream)
+    
+    except UploadSessionError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        logger.exception("Error in chunk upload")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/chunk_upload/sessions', methods=['POST'])
+def create_upload_session():
+    """Start a resumable upload, chunks are then sent with PUT in any order or in parallel"""
+    data = request.get_json(silent=True) or {}
+    filename = data.get('filename', '')
+    if not filename or not allowed_file(filename):
+        return jsonify({'error': 'Missing or unsupported filename'}), 400
+    
+    try:
+        total_size = int(data['total_size'])
+        chunk_size = int(data['chunk_size'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'total_size and chunk_size are required'}), 400
+    if total_size <= 0 or chunk_size <= 0:
+        return jsonify({'error': 'total_size and chunk_size must be positive'}), 400
+    
+    try:
+        session = create_session(filename, -(-total_size // chunk_size), chunk_size=chunk_size,
+                                 total_size=total_size, session_id=data.get('session_id'))
+    except UploadSessionError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(upload_session_response(session)), 201
+
+@app.route('/chunk_upload/<session_id>', methods=['GET'])
+def upload_session_status(session_id):
+    """Report which chunks are still missing so an interrupted upload can resume"""
+    session = get_session(session_id)
+    if session is None:
+        return jsonify({'error': 'Upload session not found', 'session_id': session_id}), 404
+    return jsonify(upload_session_response(session))
+
+@app.route('/chunk_upload/<session_id>/<int:chunk_number>', methods=['PUT'])
+def put_chunk(session_id, chunk_number):
+    """Receive one chunk as the raw request body"""
+    try:
+        return store_chunk(session_id, chunk_number, request.stream)
+    except UploadSessionError as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         logger.exception("Error in chunk upload")
         return jsonify({'error': str(e)}), 500
 
+def store_chunk(session_id, chunk_number, stream):
+    """Write a chunk and queue the video for processing once the upload is complete"""
+    session, completed_path = write_chunk(session_id, chunk_number, stream)
+    if completed_path is None:
+        response = upload_session_response(session)
+        response['success'] = True
+        response['message'] = f"Chunk {chunk_number + 1}/{session['total_chunks']} received"
+        return jsonify(response)
+    
+    try:
+        media = preflight(completed_path)
+    except PreflightError as e:
+        remove_temp_file(completed_path)
+        mark_session(session['session_id'], status='rejected')
+        return jsonify({'error': str(e), 'session_id': session['session_id']}), e.status
+    
+    try:
+        job_id = submit_job(process_uploaded_video, completed_path, media)
+    except JobQueueFull as queue_error:
+        remove_temp_file(completed_path)
+        mark_session(session['session_id'], status='rejected')
+        return jsonify({'error': str(queue_error)}), 503
+    
+    mark_session(session['session_id'], status='processing', job_id=job_id)
+    return jsonify({
+        'success': True,
+        'message': 'File uploaded successfully',
+        'session_id': session['session_id'],
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('job_status', job_id=job_id),
+        'events_url': url_for('job_events', job_id=job_id)
+    }), 202
+
+def upload_session_response(session):
+    received = set(session['received'])
+    response = {
+        'session_id': session['session_id'],
+        'status': session['status'],
+        'total_chunks': session['total_chunks'],
+        'chunk_size': session['chunk_size'],
+        'total_size': session['total_size'],
+        'missing_chunks': [i for i in range(session['total_chunks']) if i not in received],
+        'upload_url': url_for('upload_session_status', session_id=session['session_id'])
+    }
+    if session.get('job_id'):
+        response['job_id'] = session['job_id']
+        response['status_url'] = url_for('job_status', job_id=session['job_id'])
+    return response
+
+def process_uploaded_video(video_path, media=None):
+    """Hash a file assembled from chunks for the transcript cache, then process it"""
+    return process_saved_video(video_path, hash_file(video_path), media)
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Return the status of a background job and its result once finished"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found', 'job_id': job_id}), 404
+    
+    response = {
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'created_at': job['created_at'],
+        'started_at': job['started_at'],
+        'finished_at': job['finished_at']
+    }
+    if job['status'] == 'finished':
+        response['result'] = job['result']
+    elif job['status'] == 'failed':
+        response.update(job['error'])
+    return jsonify(response)
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Stream the progress of a background job as server-sent events
+    
+    Each event carries the seconds elapsed since the job was queued and the partial results
+    available so far. The stream ends with a 'finished' or 'failed' event. Reconnecting clients
+    resume after the id in their Last-Event-ID header.
+    """
+    if get_job(job_id) is None:
+        return jsonify({'error': 'Job not found', 'job_id': job_id}), 404
+    last_event_id = request.headers.get('Last-Event-ID', 0, type=int)
+    
+    def generate(last_event_id):
+        while True:
+            events = wait_for_events(job_id, after=last_event_id, timeout=SSE_KEEPALIVE_SECONDS)
+            if events is None:
+                return
+            if not events:
+                # Comment line keeping proxies from closing an idle connection
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                last_event_id = event['id']
+                payload = dict(event['data'], elapsed=event['elapsed'])
+                yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(payload)}\n\n"
+                if event['event'] in ('finished', 'failed'):
+                    return
+    
+    return Response(generate(last_event_id), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/update_default_description', methods=['POST'])
 def update_default_description():
     data = request.json
     if 'default_description' in data:
-        app.config['DEFAULT_DESCRIPTION'] = data['default_description']
-        return jsonify({'success': True, 'default_description': app.config['DEFAULT_DESCRIPTION']})
+        # Stored for every worker, each picks it up on its next request
+        version = set_template('default_description', data['default_description'])
+        return jsonify({'success': True, 'default_description': data['default_description'], 'version': version})
     return jsonify({'error': 'No description provided'}), 400
 
+@app.route('/regenerate/<result_id>', methods=['POST'])
+def regenerate(result_id):
+    """
+    New description options and tags for an earlier result, without uploading the video again
+    
+    The stored summary is reused; discovery is reused too unless the JSON body sets
+    refresh_discovery or passes a new search_query.
+    """
+    stored = get_result(result_id)
+    if stored is None:
+        return jsonify({'error': 'Unknown or expired result'}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(regenerate_result(stored, refresh_discovery=bool(data.get('refresh_discovery')),
+                                         search_query=data.get('search_query')))
+    except Exception as e:
+        logger.exception("Error regenerating descriptions")
+        return jsonify({'error': str(e), 'error_type': type(e).__name__}), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics, merged across gunicorn workers when PROMETHEUS_MULTIPROC_DIR is set"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint for Choreo"""
-    return jsonify({'status': 'healthy'}), 200
+    return jsonify({'status': 'healthy', 'startup_seconds': STARTUP_SECONDS}), 200
+
+# Heavy libraries (speech_recognition, NLTK, BeautifulSoup) are imported on first use,
+# so this only covers Flask and the service modules
+STARTUP_SECONDS = round(time.perf_counter() - _startup_started, 3)
+logger.info(f"Application loaded in {STARTUP_SECONDS}s")
 
 # For Choreo deployment
 port = int(os.environ.get('PORT', 8080))
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+"""
+Generate descriptions and tags for a folder of videos without the web server.
+
+Usage:
+    python batch_process.py VIDEO_OR_DIR [...] [--output results.jsonl] [--workers N]
+    python batch_process.py --files-from list.txt --output results.jsonl
+
+Audio extraction, transcription and summarization run in a pool of worker
+processes, one video per process at a time. Related-content discovery, tags
+and descriptions run on threads in the main process as summaries come in,
+against a discovery cache file shared by all runs.
+
+Every processed video becomes one JSON line in the output file, written as
+soon as it is done. Running the same command again skips the videos that
+already have a successful line, so an interrupted backfill resumes where it
+stopped; --retry-failed also redoes the failed ones.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger('batch_process')
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv'}
+
+
+def find_videos(paths, recursive=False):
+    """Expand files and directories into a sorted list of video paths"""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in files
+                              if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS)
+                if not recursive:
+                    break
+        elif os.path.isfile(path):
+            videos.append(path)
+        else:
+            logger.warning(f"Skipping missing path: {path}")
+    return sorted({os.path.abspath(video) for video in videos})
+
+
+def load_finished(output_path, retry_failed=False):
+    """Paths already recorded in an earlier run's output"""
+    finished = set()
+    if not os.path.exists(output_path):
+        return finished
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Last line of a run that was killed mid-write
+                continue
+            if record.get('status') == 'ok' or not retry_failed:
+                finished.add(record['path'])
+    return finished
+
+
+def summarize_video(path):
+    """
+    Worker process step: hash, transcribe and summarize one video
+
+    The transcript cache is used like in the web app, so videos seen before
+    (by a server or an earlier batch run) skip transcription.
+    """
+    import app
+    from services.transcript_cache import hash_file
+
+    started = time.perf_counter()
+    content_hash = hash_file(path)
+    summary, cache_status = app.get_video_summary(path, content_hash)
+    return {
+        'content_hash': content_hash,
+        'summary': summary.text,
+        'failed': summary.text == app.TRANSCRIPTION_FAILED_MESSAGE,
+        'transcript_cache': cache_status,
+        'summary_seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def describe_video(path, summarized):
+    """Main process step: discovery, tags and descriptions for a summarized video"""
+    import app
+    from services.text_analysis import TextAnalysis
+
+    started = time.perf_counter()
+    result = app.run_video_pipeline(path, summarized['content_hash'], summary=TextAnalysis(summarized['summary']))
+    result['transcript_cache'] = summarized['transcript_cache']
+    result['stage_timings']['video'] = summarized['summary_seconds']
+    result['describe_seconds'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+class ResultWriter:
+    """Append JSON lines from several threads, flushing each line so a crash loses at most one"""
+
+    def __init__(self, path):
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.counts = {'ok': 0, 'failed': 0}
+
+    def write(self, path, status, **fields):
+        record = dict(path=path, status=status, finished_at=time.time(), **fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            self.counts[status] += 1
+        logger.info(f"{status}: {path}")
+
+    def close(self):
+        self._file.close()
+
+
+def run(videos, writer, workers, discovery_workers):
+    with ProcessPoolExecutor(max_workers=workers) as processes, \
+            ThreadPoolExecutor(max_workers=discovery_workers, thread_name_prefix='describe') as threads:
+        summaries = {processes.submit(summarize_video, path): path for path in videos}
+
+        for future in as_completed(summaries):
+            path = summaries[future]
+            try:
+                summarized = future.result()
+            except Exception as e:
+                writer.write(path, 'failed', stage='summary', error=str(e), error_type=type(e).__name__)
+                continue
+            if summarized['failed']:
+                writer.write(path, 'failed', stage='summary', error=summarized['summary'],
+                             content_hash=summarized['content_hash'])
+                continue
+            # Recorded as soon as it finishes, so an interrupted run keeps every completed video
+            described = threads.submit(describe_video, path, summarized)
+            described.add_done_callback(functools.partial(record_description, writer, path))
+
+
+def record_description(writer, path, future):
+    try:
+        writer.write(path, 'ok', **future.result())
+    except Exception as e:
+        writer.write(path, 'failed', stage='describe', error=str(e), error_type=type(e).__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help='Video files or directories of videos')
+    parser.add_argument('--files-from', help='File listing one video path per line')
+    parser.add_argument('--recursive', action='store_true', help='Descend into subdirectories')
+    parser.add_argument('--output', default='batch_results.jsonl', help='JSON Lines file to append results to')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='Worker processes for extraction and summarization')
+    parser.add_argument('--discovery-workers', type=int, default=4,
+                        help='Threads for discovery, tags and descriptions')
+    parser.add_argument('--discovery-cache',
+                        help='SQLite discovery cache shared between runs (default: DISCOVERY_CACHE_PATH or '
+                             'discovery_cache.sqlite next to the output)')
+    parser.add_argument('--retry-failed', action='store_true', help='Process videos whose earlier attempt failed')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    paths = list(args.paths)
+    if args.files_from:
+        with open(args.files_from, 'r', encoding='utf-8') as f:
+            paths.extend(line.strip() for line in f if line.strip())
+    if not paths:
+        parser.error('No videos given')
+
+    # Set before the services are imported, they read it once; worker processes inherit it
+    os.environ['DISCOVERY_CACHE_PATH'] = args.discovery_cache or os.getenv('DISCOVERY_CACHE_PATH') or \
+        os.path.join(os.path.dirname(os.path.abspath(args.output)), 'discovery_cache.sqlite')
+
+    videos = find_videos(paths, recursive=args.recursive)
+    finished = load_finished(args.output, retry_failed=args.retry_failed)
+    todo = [video for video in videos if video not in finished]
+    logger.info(f"{len(videos)} videos found, {len(videos) - len(todo)} already done, {len(todo)} to process")
+    if not todo:
+        return 0
+
+    started = time.perf_counter()
+    writer = ResultWriter(args.output)
+    try:
+        run(todo, writer, max(1, args.workers), max(1, args.discovery_workers))
+    finally:
+        writer.close()
+    logger.info(f"Processed {writer.counts['ok']} videos ({writer.counts['failed']} failed) "
+                f"in {time.perf_counter() - started:.1f}s, results in {args.output}")
+    return 1 if writer.counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+"""
+Time each processing stage offline on synthetic videos of several lengths.
+
+Usage:
+    python benchmarks/stages.py [--durations 30,120,300] [--repeat 3] [--output results.json]
+    python benchmarks/stages.py --baseline results.json [--threshold 0.2]
+
+Nothing leaves the machine:
+- test videos are generated with ffmpeg (a test pattern with tone bursts
+  separated by pauses, so the pause detector finds speech-like segments)
+- the recognizer is replaced by a fake that sleeps --recognizer-latency
+  seconds per chunk and returns generated sentences, unless --speech-backend
+  selects a local engine to measure
+- YouTube and Google are replaced by a local HTTP server replaying saved
+  result pages (--youtube-page / --blog-page) or generated ones
+
+Every stage (extract_audio, transcribe_audio, summarize, the
+searches and their parsers, generate_tags, generate_description) is run
+--repeat times per video length. The JSON written to --output can later be
+passed as --baseline; stages whose median got slower than --threshold are
+reported and make the script exit with status 1.
+"""
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import threading
+import statistics
+import tempfile
+import subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+WORDS = ('python video editing tutorial camera audio light color timeline export render scene '
+         'music voice project clip effect transition frame title lesson beginner example').split()
+# Roughly how fast people speak
+WORDS_PER_SECOND = 2.5
+# Differences below this are noise, whatever the ratio
+NOISE_FLOOR_SECONDS = 0.005
+
+
+def synthetic_blog_page(n_results=10, filler_kb=300):
+    """Build a results page shaped like Google's, with result containers among unrelated markup"""
+    results = ''.join(
+        f'<div class="g"><a href="https://example.com/post{i}"><h3>Synthetic blog post {i} about video editing</h3></a>'
+        f'<div class="VwiC3b">Snippet of blog post {i}, with tips on editing and export settings.</div></div>'
+        for i in range(n_results)
+    )
+    filler = '<div class="x"><span>filler</span><a href="#">link</a></div>\n'
+    filler = filler * max(1, filler_kb * 1024 // len(filler))
+    return f'<html><head><title>results</title></head><body>{filler}{results}{filler}</body></html>'
+
+
+def start_stand_in(pages):
+    """Serve the saved pages on localhost, keyed by path, and return the base URL"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = pages.get(self.path.split('?')[0])
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def make_video(path, seconds):
+    """Generate a small test video whose audio alternates 3 s of tone with 1 s of silence"""
+    from services.video_processor import get_ffmpeg_binary
+
+    if os.path.exists(path):
+        return path
+    subprocess.run([
+        get_ffmpeg_binary(), '-nostdin', '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', f'testsrc=size=320x240:rate=10:duration={seconds}',
+        '-f', 'lavfi', '-i', f"aevalsrc='0.4*sin(2*PI*220*t)*lt(mod(t,4),3)':s=44100:d={seconds}",
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-c:a', 'aac', '-shortest', path,
+    ], check=True)
+    return path
+
+
+def fake_recognizer(latency):
+    """Stand-in for recognize_google: sleeps like a network call and returns deterministic sentences"""
+    def recognize(audio_data):
+        time.sleep(latency)
+        seconds = len(audio_data.frame_data) / (audio_data.sample_width * audio_data.sample_rate)
+        rng = random.Random(len(audio_data.frame_data))
+        words = [rng.choice(WORDS) for _ in range(max(1, int(seconds * WORDS_PER_SECOND)))]
+        sentences = [' '.join(words[i:i + 12]).capitalize() + '.' for i in range(0, len(words), 12)]
+        return ' '.join(sentences)
+    return recognize
+
+
+def measure(func, repeat):
+    """Run func repeat times, returning its last result and the timings"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+
+def bench_video(path, duration, args, youtube_page, blog_page):
+    from services.video_processor import extract_audio_pcm, transcribe_audio
+    from services.summarizer import StreamingSummarizer
+    from services.content_discovery import (get_related_youtube_videos, search_related_blogs,
+                                            parse_youtube_results, parse_blog_results)
+    from services.content_generator import generate_tags, generate_description, build_search_query
+
+    results = []
+
+    def record(stage, func, **inputs):
+        value, timings = measure(func, args.repeat)
+        results.append({
+            'duration': duration,
+            'stage': stage,
+            'min': round(min(timings), 4),
+            'median': round(statistics.median(timings), 4),
+            'runs': len(timings),
+            'input': inputs,
+        })
+        print(f"{duration:>5}s  {stage:<22} median {results[-1]['median']:.4f}s", file=sys.stderr)
+        return value
+
+    audio = record('extract_audio', lambda: extract_audio_pcm(path), video_bytes=os.path.getsize(path))
+    recognize = None if args.speech_backend else fake_recognizer(args.recognizer_latency)
+    # Segments of the last transcription, fed to the summarizer the way get_video_summary does
+    segments = []
+
+    def transcribe():
+        segments.clear()
+        return transcribe_audio(audio, recognize=recognize, on_segment=segments.append)
+
+    def summarize():
+        summarizer = StreamingSummarizer()
+        for segment in segments:
+            summarizer.add_segment(segment)
+        return summarizer.summary()
+
+    transcript, _ = record('transcribe_audio', transcribe, audio_bytes=len(audio.frame_data))
+    summary = record('summarize', summarize, transcript_words=len(transcript.split()), segments=len(segments))
+    summary_text = summary.text
+    query = build_search_query(summary_text, analysis=summary) or summary_text[:80]
+
+    record('youtube_parse', lambda: parse_youtube_results(youtube_page), page_bytes=len(youtube_page))
+    record('blog_parse', lambda: parse_blog_results(blog_page), page_bytes=len(blog_page))
+    videos = record('youtube_search', lambda: get_related_youtube_videos(query))
+    blogs = record('blog_search', lambda: search_related_blogs(query))
+    tags = record('generate_tags', lambda: generate_tags(summary_text, videos, blogs, analysis=summary),
+                  summary_words=len(summary.words))
+    record('generate_description',
+           lambda: generate_description(summary_text, videos, blogs, '\n'.join(tags['short_tags']), analysis=summary),
+           summary_words=len(summary.words))
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change of every stage against a baseline run, returning the regressions"""
+    previous = {(row['duration'], row['stage']): row for row in baseline['results']}
+    regressions = []
+    for row in results:
+        before = previous.get((row['duration'], row['stage']))
+        if before is None:
+            continue
+        ratio = row['median'] / before['median'] if before['median'] else float('inf')
+        slower = ratio > 1 + threshold and row['median'] - before['median'] > NOISE_FLOOR_SECONDS
+        print(f"{row['duration']:>5}s  {row['stage']:<22} {before['median']:.4f}s -> {row['median']:.4f}s "
+              f"({ratio:.2f}x){'  REGRESSION' if slower else ''}")
+        if slower:
+            regressions.append(dict(row, baseline_median=before['median'], ratio=round(ratio, 3)))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--durations', default='30,120,300', help='Comma-separated video lengths in seconds')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage and length')
+    parser.add_argument('--recognizer-latency', type=float, default=0.2, help='Seconds the fake recognizer takes per chunk')
+    parser.add_argument('--speech-backend',
+                        help='Time a real SPEECH_BACKEND (with its SPEECH_MODEL_PATH) instead of the fake recognizer')
+    parser.add_argument('--youtube-page', help='Saved YouTube results page to replay')
+    parser.add_argument('--blog-page', help='Saved Google results page to replay')
+    parser.add_argument('--media-dir', default=os.path.join(tempfile.gettempdir(), 'stage_benchmark_media'),
+                        help='Where generated videos are kept between runs')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    parser.add_argument('--baseline', help='Results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Slowdown ratio reported as a regression')
+    args = parser.parse_args()
+
+    pages = {}
+    base_url = start_stand_in(pages)
+
+    # Read by the services at import time, so set before any of them is imported
+    os.environ['YOUTUBE_SEARCH_URL'] = f'{base_url}/results'
+    os.environ['BLOG_SEARCH_URL'] = f'{base_url}/search'
+    os.environ['DISCOVERY_CACHE_TTL'] = '0'
+    if args.speech_backend:
+        os.environ['SPEECH_BACKEND'] = args.speech_backend
+
+    from youtube_extractor import synthetic_page
+
+    def read(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    youtube_page = pages['/results'] = read(args.youtube_page) if args.youtube_page else synthetic_page().encode('utf-8')
+    blog_page = pages['/search'] = read(args.blog_page) if args.blog_page else synthetic_blog_page().encode('utf-8')
+
+    # Load NLTK and the parsers once, so the first video's timings do not include it
+    from services.text_analysis import TextAnalysis
+    from services.content_discovery import parse_blog_results
+    TextAnalysis('Warm up the tokenizers. Then load the stop words.')
+    parse_blog_results(synthetic_blog_page(n_results=1, filler_kb=1))
+
+    os.makedirs(args.media_dir, exist_ok=True)
+    results = []
+    for duration in (int(value) for value in args.durations.split(',')):
+        path = make_video(os.path.join(args.media_dir, f'synthetic_{duration}s.mp4'), duration)
+        results.extend(bench_video(path, duration, args,
+                                   youtube_page.decode('utf-8', 'replace'), blog_page.decode('utf-8', 'replace')))
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()},
+        'config': {'repeat': args.repeat, 'recognizer_latency': args.recognizer_latency,
+                   'speech_backend': args.speech_backend or 'fake',
+                   'youtube_page': args.youtube_page or 'synthetic', 'blog_page': args.blog_page or 'synthetic'},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} stages regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
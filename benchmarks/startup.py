@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+"""
+Measure how long a fresh worker takes to import the application.
+
+Usage:
+    python benchmarks/startup.py [--runs N] [--top N]
+
+Each run imports app in a new interpreter with -X importtime, so the numbers
+match a gunicorn worker boot or an autoscaled cold start. The report lists
+the wall time per run and the top-level modules with the largest cumulative
+import time.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_once():
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app'],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True
+    )
+    return time.perf_counter() - start, process.stderr
+
+
+def top_level_imports(importtime_output):
+    """Cumulative microseconds of the modules imported directly by app and the services"""
+    modules = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            # Two spaces of indentation mark a module imported directly by app
+            depth = (len(name) - len(name.lstrip())) // 2
+            if depth <= 1:
+                modules[name.strip()] = int(cumulative.strip())
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Number of cold imports to time')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list')
+    args = parser.parse_args()
+
+    wall_times = []
+    modules = {}
+    for _ in range(args.runs):
+        elapsed, output = import_once()
+        wall_times.append(elapsed)
+        for name, micros in top_level_imports(output).items():
+            modules.setdefault(name, []).append(micros)
+
+    slowest = sorted(((min(times), name) for name, times in modules.items()), reverse=True)[:args.top]
+    print(json.dumps({
+        'runs': args.runs,
+        'wall_seconds_min': round(min(wall_times), 3),
+        'wall_seconds_median': round(sorted(wall_times)[len(wall_times) // 2], 3),
+        'slowest_imports_ms': {name: round(micros / 1000, 1) for micros, name in slowest},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+Benchmark the YouTube results parser against the previous BeautifulSoup + regex path.
+
+Usage:
+    python benchmarks/youtube_extractor.py [saved_page.html ...] [--repeat N]
+
+Without arguments a synthetic results page is generated. Save real pages with
+your browser ("Save page as", HTML only) from https://www.youtube.com/results?search_query=...
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from services.content_discovery import parse_youtube_results
+
+
+def legacy_parse(html, max_results=5):
+    """The parser used before the single-pass extractor, kept here for comparison"""
+    soup = BeautifulSoup(html, 'html.parser')
+    videos = []
+    video_count = 0
+    script_pattern = re.compile(r'var ytInitialData = ({.*?});', re.DOTALL)
+
+    for script in soup.find_all('script'):
+        if script.string and 'ytInitialData' in script.string:
+            script_text = script.string
+            if script_pattern.search(script_text):
+                titles = re.findall(r'"title":{"runs":\[{"text":"(.*?)"}', script_text)
+                descriptions = re.findall(r'"detailedMetadataSnippets":\[\{"snippetText":{"runs":\[{"text":"(.*?)"}', script_text)
+                if not titles:
+                    titles = re.findall(r'"title":{"simpleText":"(.*?)"}', script_text)
+                if not descriptions:
+                    descriptions = re.findall(r'"descriptionSnippet":{"runs":\[{"text":"(.*?)"}', script_text)
+                for i, title in enumerate(titles):
+                    if video_count >= max_results:
+                        break
+                    description = descriptions[i] if i < len(descriptions) else "No description available"
+                    if "YouTube" in title and ("Home" in title or "Shorts" in title):
+                        continue
+                    videos.append({'title': title, 'description': description})
+                    video_count += 1
+
+    if not videos:
+        for title in re.findall(r'title="(.*?)"', html):
+            if video_count >= max_results:
+                break
+            if len(title) > 10 and "YouTube" not in title and not title.startswith('http'):
+                videos.append({'title': title, 'description': "Description not available"})
+                video_count += 1
+
+    return videos[:max_results]
+
+
+def synthetic_page(n_videos=400, filler_kb=1500):
+    """Build a results page shaped like YouTube's, with ytInitialData and unrelated markup"""
+    contents = []
+    for i in range(n_videos):
+        contents.append({'videoRenderer': {
+            'videoId': f'vid{i:05d}',
+            'title': {'runs': [{'text': f'Synthetic video number {i} about python tutorials'}]},
+            'detailedMetadataSnippets': [{'snippetText': {'runs': [{'text': f'Description of video {i}. '}, {'text': 'More text.'}]}}],
+            'thumbnail': {'thumbnails': [{'url': f'https://i.ytimg.com/vi/vid{i}/hq.jpg', 'width': 360, 'height': 202}]},
+            'ownerText': {'runs': [{'text': f'Channel {i % 17}'}]},
+        }})
+    data = {'contents': {'twoColumnSearchResultsRenderer': {'primaryContents': {
+        'sectionListRenderer': {'contents': [{'itemSectionRenderer': {'contents': contents}}]}}}}}
+    filler = '<div class="x" title="decoration">' + ('<span>filler</span>' * 50) + '</div>\n'
+    filler = filler * max(1, filler_kb * 1024 // len(filler))
+    return (
+        '<html><head><script>var ytcfg = {"a": 1};</script></head><body>'
+        + filler
+        + '<script>var ytInitialData = ' + json.dumps(data) + ';</script>'
+        + filler
+        + '</body></html>'
+    )
+
+
+def time_call(func, html, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(html)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('pages', nargs='*', help='Saved YouTube results pages')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per parser, the best time is reported')
+    args = parser.parse_args()
+
+    pages = [(path, open(path, encoding='utf-8', errors='replace').read()) for path in args.pages]
+    if not pages:
+        pages = [('synthetic', synthetic_page())]
+
+    results = []
+    for name, html in pages:
+        legacy = time_call(legacy_parse, html, args.repeat)
+        current = time_call(parse_youtube_results, html, args.repeat)
+        results.append({
+            'page': name,
+            'bytes': len(html),
+            'legacy_ms': round(legacy * 1000, 2),
+            'current_ms': round(current * 1000, 2),
+            'speedup': round(legacy / current, 1) if current else None,
+            'videos': len(parse_youtube_results(html)),
+        })
+        print(json.dumps(results[-1]))
+
+
+if __name__ == '__main__':
+    main()
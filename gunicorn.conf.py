@@ -0,0 +1,19 @@
+import os
+import shutil
+
+# Directory the workers write their Prometheus samples to, see services/metrics.py
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+
+
+def on_starting(server):
+    """Clear the samples of a previous server, otherwise their counters are added to the new ones"""
+    if MULTIPROC_DIR:
+        shutil.rmtree(MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Drop the live gauge samples of a worker that exited, its counters and histograms are kept"""
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,177 @@
+import os
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Analysis frame length used for the energy measurement, in milliseconds
+FRAME_MS = 30
+# Frames this many dB above the estimated noise floor count as speech
+SPEECH_MARGIN_DB = float(os.getenv('VAD_SPEECH_MARGIN_DB', 12))
+# Frames quieter than this (dBFS) are never speech, so dead air is not mistaken for a quiet talk
+MIN_SPEECH_DB = float(os.getenv('VAD_MIN_SPEECH_DB', -50))
+# Pauses shorter than this are bridged and treated as part of the surrounding speech
+MIN_SILENCE_MS = int(os.getenv('VAD_MIN_SILENCE_MS', 500))
+# Speech bursts shorter than this are dropped as clicks or noise
+MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', 250))
+# Audio kept on both sides of a speech region so words are not clipped
+PADDING_MS = 200
+# Longest segment handed to the recognizer, in seconds
+MAX_SEGMENT_SECONDS = 30
+# Silence put between the speech regions packed into one segment, so words of different regions do not run together
+JOINER_MS = 300
+# Frames within this many dB of the quietest one are equally good cut points, the latest is used
+CUT_MARGIN_DB = 3
+
+
+def find_speech_segments(samples, sample_rate, max_segment_seconds=MAX_SEGMENT_SECONDS):
+    """
+    Find the regions of an audio signal that contain speech
+
+    The signal is cut into short frames and each frame's energy is compared
+    against a threshold derived from the noise floor of the recording. Short
+    pauses are bridged, long regions are split at their quietest point and
+    neighbouring regions are packed together up to max_segment_seconds so the
+    recognizer gets as few calls as possible. Only the regions themselves are
+    packed, the silence between them is left out; the caller joins their
+    samples with JOINER_MS of silence, which the budget accounts for.
+
+    Args:
+        samples: 1-D array of mono PCM samples (int16 or float)
+        sample_rate: Sample rate of the signal in Hz
+        max_segment_seconds: Upper bound on the length of a returned segment, joiners included
+
+    Returns:
+        list: One list per segment of the (start, end) sample offsets of its speech regions, in order
+    """
+    samples = np.asarray(samples)
+    frame_len = max(1, int(sample_rate * FRAME_MS / 1000))
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return []
+
+    frame_db = _frame_energy_db(samples, frame_len, n_frames)
+    voiced = _classify_frames(frame_db)
+
+    # Bridge short pauses, then drop bursts that are too short to be words
+    voiced = _fill_short_runs(voiced, False, _ms_to_frames(MIN_SILENCE_MS, frame_len, sample_rate))
+    voiced = _fill_short_runs(voiced, True, _ms_to_frames(MIN_SPEECH_MS, frame_len, sample_rate))
+
+    starts, ends = _runs(voiced, True)
+    if len(starts) == 0:
+        return []
+
+    # Pad every region and merge the ones that now overlap
+    padding = _ms_to_frames(PADDING_MS, frame_len, sample_rate)
+    starts = np.maximum(starts - padding, 0)
+    ends = np.minimum(ends + padding, n_frames)
+    regions = _merge_overlapping(starts, ends)
+
+    max_frames = max(1, int(max_segment_seconds * sample_rate / frame_len))
+    regions = _split_long_regions(regions, frame_db, max_frames)
+    segments = _pack_regions(regions, max_frames, _ms_to_frames(JOINER_MS, frame_len, sample_rate))
+
+    # The trailing partial frame belongs to the last region if it reaches the end
+    total = len(samples)
+    return [[(start * frame_len, total if end == n_frames else end * frame_len) for start, end in segment]
+            for segment in segments]
+
+
+def fixed_segments(n_samples, sample_rate, segment_seconds=MAX_SEGMENT_SECONDS):
+    """Cut a signal into fixed-length windows without looking at its content, one region per segment"""
+    step = max(1, int(segment_seconds * sample_rate))
+    return [[(start, min(start + step, n_samples))] for start in range(0, n_samples, step)]
+
+
+def joiner_samples(sample_rate):
+    """Number of silent samples put between the regions of a segment"""
+    return int(sample_rate * JOINER_MS / 1000)
+
+
+def _frame_energy_db(samples, frame_len, n_frames):
+    """RMS energy of each frame in dB relative to full scale"""
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+    if samples.dtype == np.int16:
+        frames /= 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20.0 * np.log10(rms + 1e-10)
+
+
+def _classify_frames(frame_db):
+    """Mark frames loud enough relative to the noise floor as speech"""
+    noise_floor = np.percentile(frame_db, 10)
+    threshold = max(noise_floor + SPEECH_MARGIN_DB, MIN_SPEECH_DB)
+    # A recording that is loud throughout has no measurable floor, treat it all as speech
+    if np.percentile(frame_db, 90) - noise_floor < SPEECH_MARGIN_DB and noise_floor > MIN_SPEECH_DB:
+        return np.ones(len(frame_db), dtype=bool)
+    return frame_db > threshold
+
+
+def _runs(mask, value):
+    """Start and end (exclusive) indices of the runs of value in a boolean mask"""
+    padded = np.concatenate(([False], mask == value, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges[0::2], edges[1::2]
+
+
+def _fill_short_runs(mask, value, min_len):
+    """Flip runs of value shorter than min_len, leaving runs touching the edges alone"""
+    if min_len <= 1:
+        return mask
+    starts, ends = _runs(mask, value)
+    short = (ends - starts) < min_len
+    if value is False:
+        # Leading and trailing silence is not a pause between words
+        short &= (starts > 0) & (ends < len(mask))
+    result = mask.copy()
+    for start, end in zip(starts[short], ends[short]):
+        result[start:end] = not value
+    return result
+
+
+def _merge_overlapping(starts, ends):
+    regions = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if regions and start <= regions[-1][1]:
+            regions[-1][1] = max(regions[-1][1], end)
+        else:
+            regions.append([start, end])
+    return [tuple(region) for region in regions]
+
+
+def _split_long_regions(regions, frame_db, max_frames):
+    """
+    Split regions longer than max_frames near the quietest frame of their second half
+
+    The cut goes after the latest frame within CUT_MARGIN_DB of the minimum, so
+    steady speech without a real dip is cut close to max_frames instead of at
+    whatever frame happens to be marginally quieter halfway through.
+    """
+    result = []
+    for start, end in regions:
+        while end - start > max_frames:
+            window = frame_db[start + max_frames // 2:start + max_frames]
+            quiet = np.flatnonzero(window <= window.min() + CUT_MARGIN_DB)
+            cut = start + max_frames // 2 + int(quiet[-1]) + 1
+            result.append((start, cut))
+            start = cut
+        result.append((start, end))
+    return result
+
+
+def _pack_regions(regions, max_frames, joiner_frames):
+    """Group consecutive regions while their speech plus the joiners between them fits in max_frames"""
+    packed = []
+    length = 0
+    for start, end in regions:
+        if packed and length + joiner_frames + end - start <= max_frames:
+            packed[-1].append((start, end))
+            length += joiner_frames + end - start
+        else:
+            packed.append([(start, end)])
+            length = end - start
+    return packed
+
+
+def _ms_to_frames(ms, frame_len, sample_rate):
+    return max(1, int(round(ms * sample_rate / 1000 / frame_len)))
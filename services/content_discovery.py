@@ -1,13 +1,26 @@
+import os
 import logging
-import requests
-from bs4 import BeautifulSoup
 import re
+import json
 import random
 import urllib.parse
 import time
+from services.discovery_cache import cached_discovery
+from services.html_parsing import parse_html
+from services.http_client import get_text
+from services.metrics import time_step
 
 logger = logging.getLogger(__name__)
 
+YT_INITIAL_DATA_MARKER = 'ytInitialData'
+# Search pages scraped for related content, overridable to point at a local stand-in
+YOUTUBE_SEARCH_URL = os.getenv('YOUTUBE_SEARCH_URL', 'https://www.youtube.com/results')
+BLOG_SEARCH_URL = os.getenv('BLOG_SEARCH_URL', 'https://www.google.com/search')
+
+_json_decoder = json.JSONDecoder()
+
+@cached_discovery('youtube')
+@time_step('youtube_search')
 def get_related_youtube_videos(query, api_key=None, max_results=5):
     """
     Search for related YouTube videos based on the query using web scraping instead of API
@@ -23,89 +36,126 @@ def get_related_youtube_videos(query, api_key=None, max_results=5):
     try:
         # Construct search URL
         search_query = urllib.parse.quote(query)
-        url = f"https://www.youtube.com/results?search_query={search_query}"
+        url = f"{YOUTUBE_SEARCH_URL}?search_query={search_query}"
         
         # Add a user agent to avoid being blocked
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        # Send request
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            logger.error(f"Failed to get YouTube results: {response.status_code}")
+        # Send request through the shared pool, bounded by the discovery deadline
+        status, html = get_text(url, headers=headers)
+        if status != 200:
+            logger.error(f"Failed to get YouTube results: {status}")
             return []
             
-        # Parse the response with BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract video information
-        videos = []
-        video_count = 0
-        
-        # Look for JSON data in script tags (YouTube stores data in script tags)
-        script_pattern = re.compile(r'var ytInitialData = ({.*?});', re.DOTALL)
-        scripts = soup.find_all('script')
-        
-        for script in scripts:
-            if script.string and 'ytInitialData' in script.string:
-                script_text = script.string
-                json_match = script_pattern.search(script_text)
-                
-                if json_match:
-                    try:
-                        # This is a simplified approach - in practice this needs more robust parsing
-                        # We're looking for titles and descriptions in the HTML
-                        titles = re.findall(r'"title":{"runs":\[{"text":"(.*?)"}', script_text)
-                        descriptions = re.findall(r'"detailedMetadataSnippets":\[\{"snippetText":{"runs":\[{"text":"(.*?)"}', script_text)
-                        
-                        # Some fallback patterns
-                        if not titles:
-                            titles = re.findall(r'"title":{"simpleText":"(.*?)"}', script_text)
-                        
-                        if not descriptions:
-                            descriptions = re.findall(r'"descriptionSnippet":{"runs":\[{"text":"(.*?)"}', script_text)
-                        
-                        # Combine titles and descriptions
-                        for i, title in enumerate(titles):
-                            if video_count >= max_results:
-                                break
-                                
-                            description = descriptions[i] if i < len(descriptions) else "No description available"
-                            
-                            # Skip YouTube Shorts and other non-video content
-                            if "YouTube" in title and ("Home" in title or "Shorts" in title):
-                                continue
-                                
-                            videos.append({
-                                'title': title,
-                                'description': description
-                            })
-                            video_count += 1
-                    except Exception as e:
-                        logger.error(f"Error parsing YouTube data: {e}")
-        
-        # If we couldn't extract videos, use a fallback approach with regex
-        if not videos:
-            video_titles = re.findall(r'title="(.*?)"', response.text)
-            for title in video_titles:
-                if video_count >= max_results:
-                    break
-                    
-                # Filter out irrelevant titles
-                if len(title) > 10 and "YouTube" not in title and not title.startswith('http'):
-                    videos.append({
-                        'title': title,
-                        'description': "Description not available"
-                    })
-                    video_count += 1
-                    
-        return videos[:max_results]
+        return parse_youtube_results(html, max_results)
     except Exception as e:
         logger.exception(f"Error getting YouTube videos: {e}")
         return []
 
-def search_related_blogs(query, serpapi_key=None, num_results=5):
+def parse_youtube_results(html, max_results=5):
+    """
+    Extract video titles and descriptions from a YouTube results page
+    
+    Args:
+        html: Text of the results page
+        max_results: Maximum number of results to return
+        
+    Returns:
+        list: List of dictionaries containing video title and description
+    """
+    videos = []
+    
+    # YouTube embeds the results as JSON in the page, decode only that blob
+    initial_data = extract_yt_initial_data(html)
+    if initial_data is not None:
+        for renderer in iter_video_renderers(initial_data):
+            if len(videos) >= max_results:
+                break
+            title = _text_of(renderer.get('title'))
+            if not title:
+                continue
+            videos.append({
+                'title': title,
+                'description': _video_description(renderer)
+            })
+    
+    # If we couldn't extract videos, use a fallback approach with regex
+    if not videos:
+        for title in re.findall(r'title="(.*?)"', html):
+            if len(videos) >= max_results:
+                break
+                
+            # Filter out irrelevant titles
+            if len(title) > 10 and "YouTube" not in title and not title.startswith('http'):
+                videos.append({
+                    'title': title,
+                    'description': "Description not available"
+                })
+    
+    return videos
+
+def extract_yt_initial_data(html):
+    """
+    Find and decode the ytInitialData JSON object embedded in a YouTube page
+    
+    The page is scanned once for the assignment and the JSON decoder reads the
+    object in place, so neither an HTML tree nor a copy of the script is built.
+    
+    Returns:
+        dict: The decoded data, or None if the page does not contain it
+    """
+    position = 0
+    while True:
+        marker = html.find(YT_INITIAL_DATA_MARKER, position)
+        if marker == -1:
+            return None
+        position = marker + len(YT_INITIAL_DATA_MARKER)
+        
+        # Skip the assignment ("ytInitialData = {" or 'window["ytInitialData"] = {')
+        start = position
+        while start < len(html) and html[start] in '"] =':
+            start += 1
+        if start < len(html) and html[start] == '{':
+            try:
+                data, _ = _json_decoder.raw_decode(html, start)
+                return data
+            except ValueError as e:
+                logger.error(f"Error parsing YouTube data: {e}")
+                return None
+
+def iter_video_renderers(data):
+    """Yield the videoRenderer objects of decoded YouTube data in page order"""
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            renderer = node.get('videoRenderer')
+            if isinstance(renderer, dict):
+                yield renderer
+                continue
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+def _text_of(field):
+    """Plain text of a YouTube text field ({"runs": [...]} or {"simpleText": ...})"""
+    if not isinstance(field, dict):
+        return ''
+    if 'simpleText' in field:
+        return field['simpleText']
+    return ''.join(run.get('text', '') for run in field.get('runs', []))
+
+def _video_description(renderer):
+    snippets = renderer.get('detailedMetadataSnippets')
+    if snippets:
+        description = _text_of(snippets[0].get('snippetText'))
+        if description:
+            return description
+    return _text_of(renderer.get('descriptionSnippet')) or "No description available"
+
+def search_related_blogs(query, serpapi_key=None, num_results=5, refresh=False):
     """
     Search for related blog posts using web scraping instead of SerpAPI
     
@@ -113,80 +163,102 @@ def search_related_blogs(query, serpapi_key=None, num_results=5):
         query: Search query (video summary)
         serpapi_key: Not used in this version
         num_results: Number of results to return
+        refresh: Skip the discovery cache lookup
         
     Returns:
         list: List of dictionaries containing blog title and description
     """
     try:
-        # Construct search URL for blog posts
-        search_query = urllib.parse.quote(f"{query} blog")
-        url = f"https://www.google.com/search?q={search_query}"
-        
-        # Add a user agent to avoid being blocked
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        return _scrape_blogs(query, serpapi_key, num_results, refresh=refresh)
+    except Exception as e:
+        logger.exception(f"Error getting blog posts: {e}")
         
-        # Send request
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            logger.error(f"Failed to get search results: {response.status_code}")
+        # Generate some placeholder content if all else fails, outside the cache so the search is retried next time
+        try:
+            return generate_placeholder_blogs(query, num_results)
+        except Exception as e2:
+            logger.exception(f"Error generating placeholder blog posts: {e2}")
             return []
+
+@cached_discovery('blogs')
+@time_step('blog_search')
+def _scrape_blogs(query, serpapi_key=None, num_results=5):
+    """Scrape the search results page, raising when the request fails so nothing is cached"""
+    # Construct search URL for blog posts
+    search_query = urllib.parse.quote(f"{query} blog")
+    url = f"{BLOG_SEARCH_URL}?q={search_query}"
+    
+    # Add a user agent to avoid being blocked
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+    
+    # Send request through the shared pool, bounded by the discovery deadline
+    status, html = get_text(url, headers=headers)
+    if status != 200:
+        logger.error(f"Failed to get search results: {status}")
+        return []
+        
+    soup = parse_blog_results(html)
+    
+    # Extract blog information
+    blogs = []
+    
+    # Find search result elements
+    search_results = soup.find_all('div', class_='g')
+    
+    for result in search_results:
+        if len(blogs) >= num_results:
+            break
+            
+        # Extract title
+        title_element = result.find('h3')
+        if not title_element:
+            continue
             
-        # Parse the response with BeautifulSoup
-        soup = BeautifulSoup(response.text, 'html.parser')
+        title = title_element.text
         
-        # Extract blog information
-        blogs = []
+        # Extract description
+        description_element = result.find('div', class_='VwiC3b')
+        description = description_element.text if description_element else "No description available"
         
-        # Find search result elements
-        search_results = soup.find_all('div', class_='g')
+        blogs.append({
+            'title': title,
+            'description': description
+        })
+        
+    # If traditional method doesn't work, try alternative selectors
+    if not blogs:
+        titles = [h.text for h in soup.find_all('h3') if h.text]
+        snippets = [div.text for div in soup.select('div.BNeawe.s3v9rd.AP7Wnd') if div.text]
         
-        for result in search_results:
-            if len(blogs) >= num_results:
+        for i, title in enumerate(titles):
+            if i >= num_results:
                 break
                 
-            # Extract title
-            title_element = result.find('h3')
-            if not title_element:
-                continue
-                
-            title = title_element.text
-            
-            # Extract description
-            description_element = result.find('div', class_='VwiC3b')
-            description = description_element.text if description_element else "No description available"
-            
+            description = snippets[i] if i < len(snippets) else "No description available"
             blogs.append({
                 'title': title,
                 'description': description
             })
             
-        # If traditional method doesn't work, try alternative selectors
-        if not blogs:
-            titles = [h.text for h in soup.find_all('h3') if h.text]
-            snippets = [div.text for div in soup.select('div.BNeawe.s3v9rd.AP7Wnd') if div.text]
-            
-            for i, title in enumerate(titles):
-                if i >= num_results:
-                    break
-                    
-                description = snippets[i] if i < len(snippets) else "No description available"
-                blogs.append({
-                    'title': title,
-                    'description': description
-                })
-                
-        return blogs[:num_results]
-    except Exception as e:
-        logger.exception(f"Error getting blog posts: {e}")
-        
-        # Generate some placeholder content if all else fails
-        try:
-            return generate_placeholder_blogs(query, num_results)
-        except Exception as e2:
-            logger.exception(f"Error generating placeholder blog posts: {e2}")
-            return []
+    return blogs[:num_results]
+
+def parse_blog_results(html):
+    """Parse a Google results page, building only the result containers and headings"""
+    from bs4 import SoupStrainer
+    return parse_html(html, parse_only=SoupStrainer(_is_blog_result_node), metric_prefix='blog_parse')
+
+def _is_blog_result_node(name, attrs):
+    """Strainer test for the elements search_related_blogs reads"""
+    if name == 'h3':
+        return True
+    if name != 'div':
+        return False
+    classes = (attrs or {}).get('class') or ''
+    if isinstance(classes, str):
+        classes = classes.split()
+    return 'g' in classes or 'BNeawe' in classes
 
 def generate_placeholder_blogs(query, num_results=5):
     """Generate placeholder blog content based on the query keywords"""
@@ -2,14 +2,15 @@ import logging
 import re
 from collections import Counter
 import random
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-from nltk.probability import FreqDist
+from services.nlp_resources import get_stop_words, word_tokenize
+from services.text_analysis import get_analysis
+from services.tag_engine import count_ngrams, select_tags
+from services.metrics import time_step
 
 logger = logging.getLogger(__name__)
 
-def generate_description(video_summary, youtube_videos, blog_posts, default_description):
+@time_step('generate_description')
+def generate_description(video_summary, youtube_videos, blog_posts, default_description, top_keywords=None, analysis=None):
     """
     Generate a detailed description for the YouTube video using NLP techniques
     
@@ -18,25 +19,18 @@ def generate_description(video_summary, youtube_videos, blog_posts, default_desc
         youtube_videos: List of related YouTube videos
         blog_posts: List of related blog posts
         default_description: Default description to append
+        top_keywords: Keywords already extracted from the summary with extract_keywords
+        analysis: Optional TextAnalysis of the summary
         
     Returns:
         dict: Contains main description, short description options, and validation info
     """
     try:
-        # Ensure NLTK resources are downloaded
-        try:
-            nltk.data.find('tokenizers/punkt')
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('punkt')
-            nltk.download('stopwords')
-            
+        analysis = get_analysis(video_summary, analysis)
+        
         # Get important keywords
-        stop_words = set(stopwords.words('english'))
-        all_words = word_tokenize(video_summary.lower())
-        filtered_words = [word for word in all_words if word.isalnum() and word not in stop_words]
-        word_freq = FreqDist(filtered_words)
-        top_keywords = [word for word, _ in word_freq.most_common(20)]
+        if top_keywords is None:
+            top_keywords = analysis.top_keywords(20)
         
         # Create a simpler intro using top keywords
         intro_templates = [
@@ -52,7 +46,7 @@ def generate_description(video_summary, youtube_videos, blog_posts, default_desc
         intro = intro_template.format(**keyword_dict)
         
         # Create a concise description using the summary
-        summary_sentences = sent_tokenize(video_summary)
+        summary_sentences = analysis.sentences
         short_description = intro + " " + " ".join(summary_sentences[:min(3, len(summary_sentences))])
         
         # Ensure it's not too long (4-5 lines, about 300-400 chars)
@@ -78,13 +72,13 @@ def generate_description(video_summary, youtube_videos, blog_posts, default_desc
                 short_description_options.append(blog_option)
                 
         # Option 4: Statistical approach using most frequent terms
-        stat_option = generate_statistical_option(video_summary, top_keywords)
+        stat_option = generate_statistical_option(video_summary, top_keywords, analysis)
         if stat_option:
             short_description_options.append(stat_option)
             
         # Ensure we have at least 3 options
         while len(short_description_options) < 3:
-            extra_option = generate_extra_option(video_summary, top_keywords)
+            extra_option = generate_extra_option(video_summary, top_keywords, analysis)
             if extra_option and extra_option not in short_description_options:
                 short_description_options.append(extra_option)
                 
@@ -107,6 +101,84 @@ def generate_description(video_summary, youtube_videos, blog_posts, default_desc
             'validation_issues': []
         }
 
+def extract_keywords(text, count=20, analysis=None):
+    """
+    Extract the most frequent non-stopword terms of a text
+    
+    Args:
+        text: Text to extract keywords from
+        count: Number of keywords to return
+        analysis: Optional TextAnalysis of the text
+        
+    Returns:
+        list: Keywords, most frequent first
+    """
+    return get_analysis(text, analysis).top_keywords(count)
+
+def build_search_query(text, max_chars=80, max_bigrams=2, analysis=None):
+    """
+    Build a short, canonical search query from the most important terms of a text
+    
+    Frequent bigrams are used first since they carry the topic best, then the
+    top single keywords fill the remaining length budget. The query is
+    lowercase and terms are ordered by frequency (ties alphabetically), so the
+    same content always produces the same query.
+    
+    Args:
+        text: Text to build the query from, usually the video summary
+        max_chars: Maximum length of the query
+        max_bigrams: Maximum number of two-word phrases in the query
+        analysis: Optional TextAnalysis of the text
+        
+    Returns:
+        str: The search query
+    """
+    from nltk.probability import FreqDist
+    
+    analysis = get_analysis(text, analysis)
+    stop_words = get_stop_words()
+    unigram_freq = FreqDist()
+    bigram_freq = FreqDist()
+    # Count phrases per sentence so they never span a sentence boundary
+    for tokens in analysis.sentence_tokens:
+        words = [word for word in tokens
+                 if word.isalnum() and word not in stop_words and len(word) > 2]
+        unigram_freq.update(words)
+        bigram_freq.update(zip(words, words[1:]))
+    
+    # Only phrases that repeat are worth more than their words on their own
+    bigrams = sorted(((count, pair) for pair, count in bigram_freq.items() if count > 1 and pair[0] != pair[1]),
+                     key=lambda item: (-item[0], item[1]))
+    unigrams = sorted(unigram_freq.items(), key=lambda item: (-item[1], item[0]))
+    
+    terms = []
+    used_words = set()
+    length = 0
+    
+    def add(term, term_words):
+        nonlocal length
+        added_length = len(term) + (1 if terms else 0)
+        if length + added_length > max_chars:
+            return False
+        terms.append(term)
+        used_words.update(term_words)
+        length += added_length
+        return True
+    
+    for _, pair in bigrams:
+        if len(terms) >= max_bigrams:
+            break
+        # Overlapping phrases would repeat a word in the query
+        if not used_words.intersection(pair):
+            add(' '.join(pair), pair)
+    for word, _ in unigrams:
+        if word not in used_words:
+            add(word, (word,))
+        if length >= max_chars:
+            break
+    
+    return ' '.join(terms)
+
 def validate_description(description):
     """Validate description for common issues"""
     issues = []
@@ -204,14 +276,14 @@ def generate_option_from_blogs(blog_posts, keywords):
         logger.exception(f"Error generating blog option: {e}")
         return None
 
-def generate_statistical_option(summary, keywords):
+def generate_statistical_option(summary, keywords, analysis=None):
     """Generate a description option using statistical NLP approach"""
     try:
         if not summary or not keywords:
             return None
             
         # Extract key sentences containing most keywords
-        sentences = sent_tokenize(summary)
+        sentences = get_analysis(summary, analysis).sentences
         if not sentences:
             return None
             
@@ -253,7 +325,7 @@ def generate_statistical_option(summary, keywords):
         logger.exception(f"Error generating statistical option: {e}")
         return None
 
-def generate_extra_option(summary, keywords):
+def generate_extra_option(summary, keywords, analysis=None):
     """Generate an additional description option as fallback"""
     try:
         if not summary or not keywords:
@@ -270,7 +342,8 @@ def generate_extra_option(summary, keywords):
         keyword_str = " and ".join(random.sample(keywords[:10], min(2, len(keywords[:10]))))
         
         # Use just the first sentence of the summary
-        first_sentence = sent_tokenize(summary)[0] if sent_tokenize(summary) else summary[:100]
+        sentences = get_analysis(summary, analysis).sentences
+        first_sentence = sentences[0] if sentences else summary[:100]
         
         description = template.format(keywords=keyword_str, summary=first_sentence)
         
@@ -283,7 +356,8 @@ def generate_extra_option(summary, keywords):
         logger.exception(f"Error generating extra option: {e}")
         return None
 
-def generate_tags(video_summary, youtube_videos, blog_posts):
+@time_step('generate_tags')
+def generate_tags(video_summary, youtube_videos, blog_posts, analysis=None, max_tags=10):
     """
     Generate relevant tags for the YouTube video using NLP instead of OpenAI
     
@@ -291,74 +365,33 @@ def generate_tags(video_summary, youtube_videos, blog_posts):
         video_summary: Summary of the video content
         youtube_videos: List of related YouTube videos
         blog_posts: List of related blog posts
+        analysis: Optional TextAnalysis of the summary
+        max_tags: Number of short tags to generate
         
     Returns:
         dict: Dictionary containing short_tags and hashtag_tags
     """
     try:
-        # Ensure NLTK resources are downloaded
-        try:
-            nltk.data.find('tokenizers/punkt')
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('punkt')
-            nltk.download('stopwords')
-            
-        # Collect all text for keyword extraction
-        all_text = video_summary
+        analysis = get_analysis(video_summary, analysis)
+        stop_words = get_stop_words()
+        
+        def keep(tokens):
+            return [word for word in tokens if word.isalnum() and word not in stop_words and len(word) > 2]
+        
+        # Summary sentences are already tokenized, titles are tokenized one by one
+        # so phrases never run from one title into the next
+        segments = [keep(tokens) for tokens in analysis.sentence_tokens]
+        for item in list(youtube_videos) + list(blog_posts):
+            title = item.get('title', '')
+            if title:
+                segments.append(keep(word_tokenize(title.lower())))
         
-        # Add titles from YouTube videos
-        for video in youtube_videos:
-            all_text += " " + video.get('title', '')
-            
-        # Add titles from blog posts
-        for blog in blog_posts:
-            all_text += " " + blog.get('title', '')
-            
         # Extract n-grams (1, 2, and 3 words) to find common phrases
-        stop_words = set(stopwords.words('english'))
-        words = [word.lower() for word in word_tokenize(all_text) 
-                if word.isalnum() and word.lower() not in stop_words and len(word) > 2]
-        
-        # Get word frequency
-        unigrams = FreqDist(words)
-        
-        # Get bigrams (2-word phrases)
-        bigrams = []
-        for i in range(len(words) - 1):
-            bigrams.append(words[i] + " " + words[i+1])
-        bigram_freq = FreqDist(bigrams)
-        
-        # Get trigrams (3-word phrases)
-        trigrams = []
-        for i in range(len(words) - 2):
-            trigrams.append(words[i] + " " + words[i+1] + " " + words[i+2])
-        trigram_freq = FreqDist(trigrams)
-        
-        # Select top phrases for tags
-        top_unigrams = [word for word, _ in unigrams.most_common(10)]
-        top_bigrams = [phrase for phrase, _ in bigram_freq.most_common(5)]
-        top_trigrams = [phrase for phrase, _ in trigram_freq.most_common(3)]
-        
-        # Combine for short tags, ensuring no duplicates
-        short_tags = []
-        for tag in top_trigrams + top_bigrams + top_unigrams:
-            # Check for duplicates
-            is_duplicate = False
-            for existing_tag in short_tags:
-                if tag in existing_tag or existing_tag in tag:
-                    is_duplicate = True
-                    break
-                    
-            if not is_duplicate and len(short_tags) < 10:
-                # Capitalize first letter of each word
-                short_tags.append(' '.join(word.capitalize() for word in tag.split()))
-                
-        # Fill any remaining slots with single words if needed
-        while len(short_tags) < 10 and len(top_unigrams) > 0:
-            word = top_unigrams.pop(0).capitalize()
-            if word not in short_tags:
-                short_tags.append(word)
+        ngram_counts = count_ngrams(segments)
+        
+        # Capitalize first letter of each word
+        short_tags = [' '.join(word.capitalize() for word in tag)
+                      for tag in select_tags(ngram_counts, max_tags)]
                 
         # Generate hashtag tags (combination of words without spaces, with # prefix)
         hashtag_tags = []
@@ -382,7 +415,7 @@ def generate_tags(video_summary, youtube_videos, blog_posts):
         common_words = [word for word in words if len(word) > 3 and word not in ['with', 'that', 'this', 'from', 'have', 'what', 'were', 'when', 'your', 'which', 'their']]
         
         word_counts = Counter(common_words)
-        top_words = [word.capitalize() for word, _ in word_counts.most_common(10)]
+        top_words = [word.capitalize() for word, _ in word_counts.most_common(max_tags)]
         
         return {
             'short_tags': top_words,
@@ -0,0 +1,146 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from services.metrics import record_cache_lookup
+from services import sqlite_store
+
+logger = logging.getLogger(__name__)
+
+# Seconds a discovery result stays valid, 0 disables caching
+CACHE_TTL = int(os.getenv('DISCOVERY_CACHE_TTL', 6 * 3600))
+# Maximum number of results kept in each backend
+CACHE_MAX_ENTRIES = int(os.getenv('DISCOVERY_CACHE_MAX_ENTRIES', 1000))
+# Optional SQLite file shared by all worker processes, memory only when unset
+CACHE_PATH = os.getenv('DISCOVERY_CACHE_PATH')
+
+# Table of the shared disk cache
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS discovery_cache '
+    '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+)
+
+_memory = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def normalize_query(query):
+    """Canonical form of a search query, so trivially different queries share a cache entry"""
+    return re.sub(r'\s+', ' ', query or '').strip().lower()
+
+
+def cached_discovery(namespace):
+    """
+    Cache the results of a discovery function keyed on its normalized query
+
+    Results are kept in memory and, when DISCOVERY_CACHE_PATH is set, in a
+    SQLite file that every worker reads and writes. Empty results are not
+    cached so a blocked or failed search is retried next time. Calling the
+    wrapped function with refresh=True skips the lookup and stores the new
+    result.
+
+    Args:
+        namespace: Name separating the entries of different search functions
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(query, *args, refresh=False, **kwargs):
+            if CACHE_TTL <= 0:
+                return func(query, *args, **kwargs)
+
+            key = _cache_key(namespace, query, args, kwargs)
+            if not refresh:
+                cached = get_cached(key)
+                record_cache_lookup(f'discovery_{namespace}', cached is not None)
+                if cached is not None:
+                    logger.info(f"Discovery cache hit for {namespace}")
+                    return cached
+
+            result = func(query, *args, **kwargs)
+            if result:
+                set_cached(key, result)
+            return result
+        return wrapper
+    return decorator
+
+
+def get_cached(key):
+    """Return the cached value for a key, or None if it is missing or expired"""
+    now = time.time()
+    with _memory_lock:
+        entry = _memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                _memory.move_to_end(key)
+                return value
+            del _memory[key]
+
+    if CACHE_PATH:
+        value, expires_at = _disk_get(key, now)
+        if value is not None:
+            _memory_set(key, value, expires_at)
+            return value
+    return None
+
+
+def set_cached(key, value, ttl=None):
+    """Store a value in the memory cache and, if configured, the shared disk cache"""
+    expires_at = time.time() + (CACHE_TTL if ttl is None else ttl)
+    _memory_set(key, value, expires_at)
+    if CACHE_PATH:
+        _disk_set(key, value, expires_at)
+
+
+def _cache_key(namespace, query, args, kwargs):
+    raw = json.dumps([namespace, normalize_query(query), list(args), sorted(kwargs.items())], default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _memory_set(key, value, expires_at):
+    with _memory_lock:
+        _memory[key] = (expires_at, value)
+        _memory.move_to_end(key)
+        while len(_memory) > CACHE_MAX_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _connect():
+    """Open the shared cache database"""
+    return sqlite_store.connect(CACHE_PATH, SCHEMA)
+
+
+def _disk_get(key, now):
+    try:
+        with _connect() as connection:
+            row = connection.execute(
+                'SELECT value, expires_at FROM discovery_cache WHERE key = ? AND expires_at > ?', (key, now)
+            ).fetchone()
+        if row:
+            return json.loads(row[0]), row[1]
+    except Exception as e:
+        logger.warning(f"Discovery disk cache read failed: {e}")
+    return None, None
+
+
+def _disk_set(key, value, expires_at):
+    try:
+        with _connect() as connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO discovery_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), expires_at)
+            )
+            # Drop expired rows, then the ones closest to expiry beyond the entry limit
+            connection.execute('DELETE FROM discovery_cache WHERE expires_at <= ?', (time.time(),))
+            connection.execute(
+                'DELETE FROM discovery_cache WHERE key NOT IN '
+                '(SELECT key FROM discovery_cache ORDER BY expires_at DESC LIMIT ?)',
+                (CACHE_MAX_ENTRIES,)
+            )
+    except Exception as e:
+        logger.warning(f"Discovery disk cache write failed: {e}")
@@ -0,0 +1,74 @@
+import os
+import time
+import logging
+import tracemalloc
+import importlib.util
+from services.pipeline import record_stage_metric
+
+logger = logging.getLogger(__name__)
+
+# Report peak parser memory in the stage metrics, costs some speed while enabled
+TRACE_PARSE_MEMORY = os.getenv('HTML_PARSE_TRACE_MEMORY', '').lower() in {'1', 'true', 'yes'}
+
+_parser_backend = None
+
+
+def get_parser_backend():
+    """
+    Pick the BeautifulSoup tree builder to use
+
+    HTML_PARSER forces a backend; otherwise lxml is used when it is installed
+    and the standard library's html.parser when it is not.
+    """
+    global _parser_backend
+    if _parser_backend is None:
+        configured = os.getenv('HTML_PARSER')
+        if configured:
+            _parser_backend = configured
+        elif importlib.util.find_spec('lxml') is not None:
+            _parser_backend = 'lxml'
+        else:
+            _parser_backend = 'html.parser'
+        logger.info(f"Using {_parser_backend} to parse HTML")
+    return _parser_backend
+
+
+def parse_html(markup, parse_only=None, metric_prefix='parse'):
+    """
+    Parse an HTML page, building only the elements the caller needs
+
+    Parse time, page size and node count (plus peak memory when
+    HTML_PARSE_TRACE_MEMORY is set) are recorded as metrics of the pipeline
+    stage that is running.
+
+    Args:
+        markup: HTML text
+        parse_only: Optional bs4.SoupStrainer, elements it rejects are skipped
+            while parsing instead of being built and searched afterwards
+        metric_prefix: Prefix of the recorded metric names
+
+    Returns:
+        BeautifulSoup: The parsed document
+    """
+    from bs4 import BeautifulSoup
+    
+    backend = get_parser_backend()
+    trace_memory = TRACE_PARSE_MEMORY
+    if trace_memory:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+
+    start = time.perf_counter()
+    soup = BeautifulSoup(markup, backend, parse_only=parse_only)
+    elapsed = time.perf_counter() - start
+
+    record_stage_metric(f'{metric_prefix}_parser', backend)
+    record_stage_metric(f'{metric_prefix}_seconds', round(elapsed, 4))
+    record_stage_metric(f'{metric_prefix}_bytes', len(markup))
+    record_stage_metric(f'{metric_prefix}_nodes', sum(1 for _ in soup.descendants))
+    if trace_memory:
+        record_stage_metric(f'{metric_prefix}_peak_memory_bytes', tracemalloc.get_traced_memory()[1] - memory_before)
+
+    return soup
@@ -0,0 +1,104 @@
+import os
+import atexit
+import asyncio
+import logging
+import threading
+import concurrent.futures
+
+logger = logging.getLogger(__name__)
+
+# Seconds to establish a connection, including the TLS handshake
+CONNECT_TIMEOUT = float(os.getenv('DISCOVERY_CONNECT_TIMEOUT', 5))
+# Seconds without receiving any data before a response is abandoned
+READ_TIMEOUT = float(os.getenv('DISCOVERY_READ_TIMEOUT', 10))
+# Hard limit on a whole request, from queueing for a connection to the last byte
+REQUEST_DEADLINE = float(os.getenv('DISCOVERY_DEADLINE', 20))
+# Connections kept open per worker process, shared by all requests
+POOL_SIZE = int(os.getenv('DISCOVERY_POOL_SIZE', 20))
+# Seconds an idle connection is kept alive for reuse
+KEEPALIVE_SECONDS = 60
+
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+_session = None
+
+
+def get_text(url, headers=None, deadline=None):
+    """
+    Fetch a page through the shared connection pool, from synchronous code
+
+    The request runs on a background event loop that owns one aiohttp session
+    per worker process, so connections and TLS sessions are reused across
+    requests and threads. Connect and read timeouts apply to each step and
+    the deadline to the whole request; the calling thread never waits longer
+    than the deadline.
+
+    Args:
+        url: Page to fetch
+        headers: Optional request headers
+        deadline: Seconds the whole request may take, defaults to DISCOVERY_DEADLINE
+
+    Returns:
+        tuple: (HTTP status, response text)
+
+    Raises:
+        TimeoutError: The deadline passed
+        aiohttp.ClientError: The connection or request failed
+    """
+    deadline = REQUEST_DEADLINE if deadline is None else deadline
+    future = asyncio.run_coroutine_threadsafe(fetch_text(url, headers, deadline), _get_loop())
+    try:
+        # The coroutine enforces the deadline itself, the margin only covers scheduling
+        return future.result(timeout=deadline + 1)
+    except (asyncio.TimeoutError, concurrent.futures.TimeoutError):
+        future.cancel()
+        raise TimeoutError(f"Request to {url} timed out (deadline {deadline}s)")
+
+
+async def fetch_text(url, headers=None, deadline=REQUEST_DEADLINE):
+    """Coroutine fetching a page with the shared session, for callers already on the client's loop"""
+    session = await _get_session()
+
+    async def fetch():
+        async with session.get(url, headers=headers) as response:
+            return response.status, await response.text(errors='replace')
+
+    return await asyncio.wait_for(fetch(), deadline)
+
+
+def _get_loop():
+    """Start the event loop thread on first use, and again in a forked worker process"""
+    global _loop, _loop_pid, _session
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            _session = None
+            threading.Thread(target=_loop.run_forever, name='discovery-http', daemon=True).start()
+        return _loop
+
+
+async def _get_session():
+    """The shared session, only ever touched from the loop thread"""
+    global _session
+    if _session is None or _session.closed:
+        import aiohttp
+
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=POOL_SIZE, keepalive_timeout=KEEPALIVE_SECONDS, ttl_dns_cache=300),
+            timeout=aiohttp.ClientTimeout(connect=CONNECT_TIMEOUT, sock_connect=CONNECT_TIMEOUT, sock_read=READ_TIMEOUT),
+            # Use HTTP(S)_PROXY / NO_PROXY from the environment, like requests did
+            trust_env=True,
+        )
+    return _session
+
+
+@atexit.register
+def _close_session():
+    if _loop is None or _session is None or _loop_pid != os.getpid():
+        return
+    try:
+        asyncio.run_coroutine_threadsafe(_session.close(), _loop).result(timeout=2)
+    except Exception as e:
+        logger.debug(f"Could not close the discovery HTTP session: {e}")
@@ -0,0 +1,157 @@
+import os
+import time
+import uuid
+import logging
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Number of videos processed concurrently in the background per worker process
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+# Maximum number of jobs waiting or running before new submissions are rejected
+JOB_QUEUE_LIMIT = int(os.getenv('JOB_QUEUE_LIMIT', 16))
+# Seconds a finished job is kept around for polling
+JOB_TTL = int(os.getenv('JOB_TTL', 3600))
+
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix='video-job')
+_jobs = {}
+_lock = threading.Lock()
+_events_changed = threading.Condition(_lock)
+_current = threading.local()
+
+
+class JobQueueFull(Exception):
+    """Raised when the background queue has no room for another job"""
+
+
+def submit_job(func, *args, **kwargs):
+    """
+    Run a function on the background worker pool and track it as a job
+
+    Args:
+        func: Callable to run, its return value becomes the job result
+        *args, **kwargs: Arguments passed to the callable
+
+    Returns:
+        str: Job id that can be passed to get_job
+    """
+    with _lock:
+        _prune_finished_jobs()
+        active = sum(1 for job in _jobs.values() if job['status'] in ('queued', 'running'))
+        if active >= JOB_QUEUE_LIMIT:
+            raise JobQueueFull(f"Job queue is full ({active} active jobs)")
+
+        job_id = uuid.uuid4().hex
+        _jobs[job_id] = {
+            'job_id': job_id,
+            'status': 'queued',
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            'events': [],
+        }
+        _add_event(_jobs[job_id], 'queued', {})
+
+    _executor.submit(_run_job, job_id, func, args, kwargs)
+    logger.info(f"Queued job {job_id}")
+    return job_id
+
+
+def get_job(job_id):
+    """Return a snapshot of the job state, or None if the job is unknown"""
+    with _lock:
+        job = _jobs.get(job_id)
+        if not job:
+            return None
+        snapshot = dict(job)
+        snapshot['events'] = list(job['events'])
+        return snapshot
+
+
+def publish_event(job_id, event, data=None):
+    """
+    Add a progress event to a job, waking up everyone waiting in wait_for_events
+
+    Each event records the seconds elapsed since the job was submitted.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            _add_event(job, event, data or {})
+
+
+def get_progress_reporter():
+    """
+    Return a callable (event, data) publishing events to the job running in this thread
+
+    Returns None outside of a background job, so callers can skip reporting.
+    """
+    job_id = getattr(_current, 'job_id', None)
+    return functools.partial(publish_event, job_id) if job_id else None
+
+
+def wait_for_events(job_id, after=0, timeout=None):
+    """
+    Wait until a job has events newer than the given event id
+
+    Args:
+        job_id: Id of the job
+        after: Id of the last event already seen, 0 for all events
+        timeout: Seconds to wait, returns an empty list when nothing arrived
+
+    Returns:
+        list: New events in order, or None if the job is unknown
+    """
+    with _events_changed:
+        _events_changed.wait_for(
+            lambda: job_id not in _jobs or len(_jobs[job_id]['events']) > after, timeout=timeout)
+        job = _jobs.get(job_id)
+        return None if job is None else job['events'][after:]
+
+
+def _run_job(job_id, func, args, kwargs):
+    _update_job(job_id, 'started', status='running', started_at=time.time())
+    _current.job_id = job_id
+    try:
+        result = func(*args, **kwargs)
+        _update_job(job_id, 'finished', status='finished', result=result, finished_at=time.time())
+        logger.info(f"Job {job_id} finished")
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed: {e}")
+        _update_job(job_id, 'failed', status='failed', finished_at=time.time(),
+                    error={'error': str(e), 'error_type': type(e).__name__})
+    finally:
+        _current.job_id = None
+
+
+def _update_job(job_id, event, **fields):
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            job.update(fields)
+            data = {'result': job['result']} if event == 'finished' else dict(job['error'] or {})
+            _add_event(job, event, data)
+
+
+def _add_event(job, event, data):
+    """Append an event to a job, caller must hold the lock"""
+    job['events'].append({
+        'id': len(job['events']) + 1,
+        'event': event,
+        'elapsed': round(time.time() - job['created_at'], 3),
+        'data': data,
+    })
+    _events_changed.notify_all()
+
+
+def _prune_finished_jobs():
+    """Drop finished jobs older than JOB_TTL, caller must hold the lock"""
+    cutoff = time.time() - JOB_TTL
+    expired = [job_id for job_id, job in _jobs.items()
+               if job['finished_at'] is not None and job['finished_at'] < cutoff]
+    for job_id in expired:
+        del _jobs[job_id]
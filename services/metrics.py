@@ -0,0 +1,83 @@
+import os
+import logging
+
+# prometheus_client picks multiprocess mode when this is set at import time,
+# every gunicorn worker then writes its samples to files in the directory
+MULTIPROC_DIR = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+from prometheus_client import (CollectorRegistry, Counter, Histogram, REGISTRY,
+                               CONTENT_TYPE_LATEST, generate_latest, multiprocess)
+
+logger = logging.getLogger(__name__)
+
+# From a quick scrape to a long transcription
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+STEP_SECONDS = Histogram(
+    'video_helper_step_duration_seconds',
+    'Time spent in each processing step',
+    ['step'], buckets=LATENCY_BUCKETS
+)
+PIPELINE_STAGE_SECONDS = Histogram(
+    'video_helper_pipeline_stage_duration_seconds',
+    'Time from start to result of each pipeline stage, including timeouts and fallbacks',
+    ['stage'], buckets=LATENCY_BUCKETS
+)
+TRANSCRIBED_CHUNKS = Counter(
+    'video_helper_transcribed_chunks_total',
+    'Audio chunks sent to the speech recognizer'
+)
+RECOGNIZER_FAILURES = Counter(
+    'video_helper_recognizer_failures_total',
+    'Audio chunks the recognizer returned no text for',
+    ['reason']
+)
+CACHE_LOOKUPS = Counter(
+    'video_helper_cache_lookups_total',
+    'Cache lookups by cache and result',
+    ['cache', 'result']
+)
+RECOGNIZED_AUDIO_SECONDS = Counter(
+    'video_helper_recognized_audio_seconds_total',
+    'Seconds of audio passed to the speech recognizer',
+    ['backend']
+)
+RECOGNITION_SECONDS = Counter(
+    'video_helper_recognition_seconds_total',
+    'Time spent in the speech recognizer, divide the audio seconds by it for throughput',
+    ['backend']
+)
+UPLOADED_BYTES = Counter(
+    'video_helper_uploaded_bytes_total',
+    'Bytes of video received',
+    ['route']
+)
+
+
+def time_step(step):
+    """Decorator and context manager recording the duration of a step in STEP_SECONDS"""
+    return STEP_SECONDS.labels(step=step).time()
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.labels(cache=cache, result='hit' if hit else 'miss').inc()
+
+
+def render_metrics():
+    """
+    Render all metrics in the Prometheus text format
+
+    With PROMETHEUS_MULTIPROC_DIR set the samples of every worker process are
+    merged, so any worker can answer a scrape for the whole server.
+
+    Returns:
+        tuple: (body, content type)
+    """
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,64 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Matches the download location used in the Dockerfile
+NLTK_DATA_DIR = '/app/nltk_data'
+
+_resources_ready = False
+_stop_words = None
+_lock = threading.Lock()
+
+
+def ensure_nltk_data():
+    """
+    Make sure the punkt tokenizer and stopword corpus are available
+
+    NLTK is imported on first use and the resources are checked (and downloaded
+    as a fallback for local development) once per process.
+    """
+    global _resources_ready
+    if _resources_ready:
+        return
+    with _lock:
+        if _resources_ready:
+            return
+        import nltk
+        if NLTK_DATA_DIR not in nltk.data.path:
+            nltk.data.path.append(NLTK_DATA_DIR)
+        for resource, package in (('tokenizers/punkt', 'punkt'), ('corpora/stopwords', 'stopwords')):
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                # This should not be needed since we've pre-downloaded in Dockerfile
+                logger.warning(f"NLTK resource {resource} not found, downloading it")
+                nltk.download(package)
+        _resources_ready = True
+
+
+def get_stop_words():
+    """English stopwords as a frozenset, built once per process"""
+    global _stop_words
+    if _stop_words is None:
+        ensure_nltk_data()
+        # NLTK's lazy corpus loader is not thread-safe on first access
+        with _lock:
+            if _stop_words is None:
+                from nltk.corpus import stopwords
+                _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
+
+
+def sent_tokenize(text):
+    """nltk.sent_tokenize, loading NLTK on first use"""
+    ensure_nltk_data()
+    from nltk.tokenize import sent_tokenize as nltk_sent_tokenize
+    return nltk_sent_tokenize(text)
+
+
+def word_tokenize(text):
+    """nltk.word_tokenize, loading NLTK on first use"""
+    ensure_nltk_data()
+    from nltk.tokenize import word_tokenize as nltk_word_tokenize
+    return nltk_word_tokenize(text)
@@ -0,0 +1,150 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+_NO_DEFAULT = object()
+_current = threading.local()
+
+
+def record_stage_metric(name, value):
+    """
+    Attach a measurement to the stage running in the current thread
+
+    Code called from a stage (parsers, clients, ...) can report numbers that
+    show up next to the stage's timing. Outside of a stage this does nothing.
+    """
+    metrics = getattr(_current, 'metrics', None)
+    if metrics is not None:
+        metrics[name] = value
+
+
+class StageTimeout(Exception):
+    """Raised when a stage without a default value runs past its timeout"""
+
+
+class Stage:
+    """
+    One step of a processing pipeline
+
+    Args:
+        name: Name the stage's result is stored under
+        func: Callable receiving the results of its dependencies as keyword arguments
+        deps: Names of the stages that must finish first
+        timeout: Seconds the stage may run before it is abandoned, None for no limit
+        default: Result used when the stage fails or times out; without one the error is raised
+    """
+
+    def __init__(self, name, func, deps=(), timeout=None, default=_NO_DEFAULT):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.default = default
+
+    def fallback(self, error):
+        if self.default is _NO_DEFAULT:
+            raise error
+        logger.warning(f"Stage '{self.name}' fell back to its default: {error}")
+        return self.default
+
+
+def run_stages(stages, max_workers=4, on_stage_done=None):
+    """
+    Run pipeline stages as soon as their dependencies are done
+
+    Independent stages run at the same time on a thread pool, so the time
+    taken is the critical path through the dependency graph rather than the
+    sum of all stages. A stage that times out keeps running in its thread but
+    its result is no longer waited for.
+
+    Args:
+        stages: List of Stage objects, dependencies must refer to stages in the list
+        max_workers: Number of stages that may run concurrently
+        on_stage_done: Optional callable receiving (name, result, seconds) as each
+            stage finishes, falls back to its default or times out
+
+    Returns:
+        tuple: (results, timings, metrics) dicts keyed by stage name, timings in
+            seconds and metrics holding what stages reported with record_stage_metric
+    """
+    by_name = {stage.name: stage for stage in stages}
+    for stage in stages:
+        missing = [dep for dep in stage.deps if dep not in by_name]
+        if missing:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {missing}")
+
+    results = {}
+    timings = {}
+    metrics = {}
+    pending = list(stages)
+    running = {}  # future -> (stage, start time)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage')
+
+    try:
+        while pending or running:
+            # Start every stage whose dependencies have all produced a result
+            ready = [stage for stage in pending if all(dep in results for dep in stage.deps)]
+            for stage in ready:
+                pending.remove(stage)
+                kwargs = {dep: results[dep] for dep in stage.deps}
+                running[executor.submit(_run_stage, stage, kwargs)] = (stage, time.monotonic())
+
+            if not running:
+                raise ValueError(f"Stages have circular dependencies: {[stage.name for stage in pending]}")
+
+            done, _ = wait(list(running), timeout=_next_deadline(running), return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+
+            for future in done:
+                stage, started = running.pop(future)
+                timings[stage.name] = round(now - started, 3)
+                try:
+                    results[stage.name], stage_metrics = future.result()
+                    if stage_metrics:
+                        metrics[stage.name] = stage_metrics
+                except Exception as e:
+                    logger.exception(f"Stage '{stage.name}' failed: {e}")
+                    results[stage.name] = stage.fallback(e)
+                _notify(on_stage_done, stage.name, results[stage.name], timings[stage.name])
+
+            for future, (stage, started) in list(running.items()):
+                if stage.timeout is not None and now - started >= stage.timeout:
+                    running.pop(future)
+                    timings[stage.name] = round(now - started, 3)
+                    results[stage.name] = stage.fallback(
+                        StageTimeout(f"Stage '{stage.name}' timed out after {stage.timeout}s"))
+                    _notify(on_stage_done, stage.name, results[stage.name], timings[stage.name])
+    finally:
+        # Do not block on abandoned stages, their results are no longer needed
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return results, timings, metrics
+
+
+def _run_stage(stage, kwargs):
+    """Run a stage's function, collecting the metrics it records"""
+    _current.metrics = {}
+    try:
+        return stage.func(**kwargs), _current.metrics
+    finally:
+        _current.metrics = None
+
+
+def _notify(on_stage_done, name, result, seconds):
+    """Report a finished stage, a failing callback must not stop the pipeline"""
+    if on_stage_done is None:
+        return
+    try:
+        on_stage_done(name, result, seconds)
+    except Exception as e:
+        logger.warning(f"Stage callback for '{name}' failed: {e}")
+
+
+def _next_deadline(running):
+    """Seconds until the earliest running stage times out, None if none have a timeout"""
+    now = time.monotonic()
+    remaining = [started + stage.timeout - now for stage, started in running.values() if stage.timeout is not None]
+    return max(0, min(remaining)) if remaining else None
@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import shutil
+import logging
+import subprocess
+from services.metrics import time_step
+
+logger = logging.getLogger(__name__)
+
+# Longest video accepted, in seconds, 0 for no limit
+MAX_DURATION = float(os.getenv('PREFLIGHT_MAX_DURATION', 4 * 3600))
+# Videos longer than this are transcribed from sampled windows instead of in full
+SAMPLE_ABOVE = float(os.getenv('PREFLIGHT_SAMPLE_ABOVE', 30 * 60))
+# Number of windows spread over a sampled video, and the seconds of audio in each
+SAMPLE_WINDOWS = int(os.getenv('PREFLIGHT_SAMPLE_WINDOWS', 6))
+SAMPLE_WINDOW_SECONDS = float(os.getenv('PREFLIGHT_SAMPLE_WINDOW_SECONDS', 120))
+# Seconds the probe may take, it only reads the container headers
+PROBE_TIMEOUT = 30
+
+# Processing strategies
+FULL = 'full'
+SAMPLED = 'sampled'
+AUDIO_ONLY = 'audio_only'
+
+
+class PreflightError(Exception):
+    """Raised for uploads that cannot be processed, with the HTTP status to answer with"""
+
+    def __init__(self, message, status=422):
+        super().__init__(message)
+        self.status = status
+
+
+@time_step('preflight')
+def preflight(video_path):
+    """
+    Inspect an upload from its container headers and decide how to process it
+
+    Nothing is decoded, so a file without audio, a corrupt file or one past
+    PREFLIGHT_MAX_DURATION is rejected in milliseconds instead of after
+    the audio extraction.
+
+    Args:
+        video_path: Path to the uploaded file
+
+    Returns:
+        dict: duration, has_video, audio_stream (index), audio_codec, sample_rate,
+            channels, strategy and the (start, seconds) windows to transcribe,
+            None for the whole track
+
+    Raises:
+        PreflightError: The file cannot be processed
+    """
+    media = probe_media(video_path)
+    if media['audio_stream'] is None:
+        raise PreflightError("The video has no audio track to transcribe")
+    duration = media['duration']
+    if MAX_DURATION and duration and duration > MAX_DURATION:
+        raise PreflightError(f"The video is {duration / 60:.0f} minutes long, the limit is {MAX_DURATION / 60:.0f} minutes")
+
+    media['strategy'], media['windows'] = choose_strategy(media)
+    logger.info(f"Preflight of {video_path}: {media['strategy']}, {duration}s, "
+                f"{media['audio_codec']} {media['sample_rate']} Hz")
+    return media
+
+
+def choose_strategy(media):
+    """
+    Pick how much of the audio to transcribe
+
+    Long videos are sampled: SAMPLE_WINDOWS evenly spaced windows are decoded
+    with input seeking, so the audio in between is never decoded. Files
+    without a video stream take the audio-only path, and the rest are
+    transcribed in full.
+
+    Returns:
+        tuple: (strategy, windows) where windows is None or a list of (start, seconds)
+    """
+    duration = media['duration']
+    if duration and duration > SAMPLE_ABOVE and SAMPLE_WINDOWS * SAMPLE_WINDOW_SECONDS < duration:
+        step = duration / SAMPLE_WINDOWS
+        # Each window is centred in its share of the video
+        windows = [(round(step * i + (step - SAMPLE_WINDOW_SECONDS) / 2, 2), SAMPLE_WINDOW_SECONDS)
+                   for i in range(SAMPLE_WINDOWS)]
+        return SAMPLED, windows
+    if not media['has_video']:
+        return AUDIO_ONLY, None
+    return FULL, None
+
+
+def probe_media(video_path):
+    """Read duration and stream information with ffprobe, or from ffmpeg's input summary without it"""
+    binary = get_ffprobe_binary()
+    if binary:
+        return _probe_with_ffprobe(binary, video_path)
+    return _probe_with_ffmpeg(video_path)
+
+
+def get_ffprobe_binary():
+    """Locate ffprobe, preferring FFPROBE_BINARY, then PATH, then next to the ffmpeg in use"""
+    binary = os.getenv('FFPROBE_BINARY') or shutil.which('ffprobe')
+    if binary:
+        return binary
+    from services.video_processor import get_ffmpeg_binary
+    sibling = os.path.join(os.path.dirname(get_ffmpeg_binary()), 'ffprobe')
+    return sibling if os.path.isfile(sibling) else None
+
+
+def _probe_with_ffprobe(binary, video_path):
+    command = [binary, '-v', 'error', '-print_format', 'json', '-show_format', '-show_streams', video_path]
+    process = _run(command)
+    if process.returncode != 0:
+        raise PreflightError(_unreadable_message(process.stderr), status=400)
+    try:
+        probe = json.loads(process.stdout or b'{}')
+    except ValueError:
+        raise PreflightError("The video could not be read: ffprobe returned no usable output", status=400)
+
+    streams = probe.get('streams', [])
+    if not streams:
+        raise PreflightError("The video could not be read: no streams found", status=400)
+    audio = next((stream for stream in streams if stream.get('codec_type') == 'audio'), None)
+    duration = probe.get('format', {}).get('duration') or (audio or {}).get('duration')
+    return {
+        'duration': round(float(duration), 2) if duration not in (None, 'N/A') else None,
+        'format': probe.get('format', {}).get('format_name'),
+        # Cover art is a video stream too, but only a single picture
+        'has_video': any(stream.get('codec_type') == 'video'
+                         and not stream.get('disposition', {}).get('attached_pic') for stream in streams),
+        'audio_stream': audio['index'] if audio else None,
+        'audio_codec': audio.get('codec_name') if audio else None,
+        'sample_rate': int(audio['sample_rate']) if audio and audio.get('sample_rate') else None,
+        'channels': audio.get('channels') if audio else None,
+    }
+
+
+def _probe_with_ffmpeg(video_path):
+    from services.video_processor import get_ffmpeg_binary
+
+    # Without an output ffmpeg only opens the input, prints its summary and exits with an error
+    process = _run([get_ffmpeg_binary(), '-hide_banner', '-nostdin', '-i', video_path])
+    output = process.stderr.decode('utf-8', errors='replace')
+    streams = re.findall(r'Stream #0:(\d+)[^:]*: (Video|Audio|Data|Subtitle|Attachment): (.*)', output)
+    if not streams:
+        raise PreflightError(_unreadable_message(process.stderr), status=400)
+
+    duration = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', output)
+    audio = next(((int(index), details) for index, kind, details in streams if kind == 'Audio'), None)
+    sample_rate = re.search(r'(\d+) Hz', audio[1]) if audio else None
+    channels = re.search(r'Hz, (mono|stereo|[\d.]+)', audio[1]) if audio else None
+    input_format = re.search(r"Input #0, ([^ ]+), from", output)
+    return {
+        'duration': round(int(duration.group(1)) * 3600 + int(duration.group(2)) * 60 + float(duration.group(3)), 2)
+        if duration else None,
+        'format': input_format.group(1).rstrip(',') if input_format else None,
+        'has_video': any(kind == 'Video' and 'attached pic' not in details for _, kind, details in streams),
+        'audio_stream': audio[0] if audio else None,
+        'audio_codec': audio[1].split()[0].rstrip(',') if audio else None,
+        'sample_rate': int(sample_rate.group(1)) if sample_rate else None,
+        'channels': {'mono': 1, 'stereo': 2}.get(channels.group(1)) if channels else None,
+    }
+
+
+def _run(command):
+    try:
+        return subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=PROBE_TIMEOUT, check=False)
+    except subprocess.TimeoutExpired:
+        raise PreflightError("The video could not be read: probing its headers timed out", status=400)
+
+
+def _unreadable_message(stderr):
+    lines = [line for line in stderr.decode('utf-8', errors='replace').strip().splitlines()
+             if 'output file must be specified' not in line]
+    detail = lines[-1] if lines else 'unrecognized format'
+    return f"The video could not be read, it may be corrupt or in an unsupported format: {detail}"
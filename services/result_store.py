@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import tempfile
+from services import sqlite_store
+
+logger = logging.getLogger(__name__)
+
+# SQLite file keeping the summary, discovery results and tags of processed videos
+STORE_PATH = os.getenv('RESULT_STORE_PATH', os.path.join(tempfile.gettempdir(), 'video_results.sqlite'))
+# Seconds a result can be regenerated after it was last used
+RESULT_TTL = int(os.getenv('RESULT_STORE_TTL', 7 * 24 * 3600))
+# Maximum number of results kept, the least recently used are dropped first
+MAX_RESULTS = int(os.getenv('RESULT_STORE_MAX_ENTRIES', 10000))
+
+# Fields stored as JSON, the others are plain text
+JSON_FIELDS = ('youtube_videos', 'blog_posts', 'tags')
+
+# Table of the stored results
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS results '
+    '(result_id TEXT PRIMARY KEY, content_hash TEXT, summary TEXT NOT NULL, search_query TEXT, '
+    'youtube_videos TEXT NOT NULL, blog_posts TEXT NOT NULL, tags TEXT NOT NULL, '
+    'created_at REAL NOT NULL, expires_at REAL NOT NULL)'
+)
+
+
+def save_result(summary, search_query, youtube_videos, blog_posts, tags, content_hash=None):
+    """
+    Store what is needed to generate new descriptions for a video without processing it again
+
+    Returns:
+        str: The result id, or None when the store could not be written
+    """
+    result_id = uuid.uuid4().hex
+    now = time.time()
+    try:
+        with _connect() as connection:
+            connection.execute(
+                'INSERT INTO results (result_id, content_hash, summary, search_query, youtube_videos, blog_posts, '
+                'tags, created_at, expires_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (result_id, content_hash, summary, search_query, json.dumps(youtube_videos),
+                 json.dumps(blog_posts), json.dumps(tags), now, now + RESULT_TTL)
+            )
+            # Drop expired rows, then the least recently used beyond the entry limit:
+            # expires_at is set on save and extended by every update_result
+            connection.execute('DELETE FROM results WHERE expires_at <= ?', (now,))
+            connection.execute(
+                'DELETE FROM results WHERE result_id NOT IN '
+                '(SELECT result_id FROM results ORDER BY expires_at DESC LIMIT ?)',
+                (MAX_RESULTS,)
+            )
+    except Exception as e:
+        logger.warning(f"Result store write failed: {e}")
+        return None
+    return result_id
+
+
+def get_result(result_id):
+    """Return the stored result as a dict, or None if it is unknown or expired"""
+    try:
+        with _connect() as connection:
+            connection.row_factory = sqlite3.Row
+            row = connection.execute(
+                'SELECT * FROM results WHERE result_id = ? AND expires_at > ?', (result_id, time.time())
+            ).fetchone()
+    except Exception as e:
+        logger.warning(f"Result store read failed: {e}")
+        return None
+    if row is None:
+        return None
+    result = dict(row)
+    for field in JSON_FIELDS:
+        result[field] = json.loads(result[field])
+    return result
+
+
+def update_result(result_id, **fields):
+    """Replace stored fields of a result and extend its lifetime"""
+    columns = [field for field in fields if field in JSON_FIELDS or field == 'search_query']
+    values = [json.dumps(fields[field]) if field in JSON_FIELDS else fields[field] for field in columns]
+    assignments = ''.join(f'{column} = ?, ' for column in columns)
+    with _connect() as connection:
+        connection.execute(
+            f'UPDATE results SET {assignments}expires_at = ? WHERE result_id = ?',
+            values + [time.time() + RESULT_TTL, result_id]
+        )
+
+
+def _connect():
+    """Open the result database"""
+    return sqlite_store.connect(STORE_PATH, SCHEMA)
@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import logging
+import threading
+from services.metrics import RECOGNIZED_AUDIO_SECONDS, RECOGNITION_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Speech recognizer used for transcription: google, vosk or whisper_cpp
+SPEECH_BACKEND = os.getenv('SPEECH_BACKEND', 'google').lower()
+# Model directory (vosk) or model file / name (whisper_cpp) of the local engines
+SPEECH_MODEL_PATH = os.getenv('SPEECH_MODEL_PATH')
+# Language passed to the engines that need one
+SPEECH_LANGUAGE = os.getenv('SPEECH_LANGUAGE', 'en-US')
+# CPU threads a whisper.cpp model uses per recognition
+WHISPER_THREADS = int(os.getenv('WHISPER_THREADS', os.cpu_count() or 4))
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+class SpeechBackend:
+    """
+    A speech recognition engine
+
+    Subclasses load their model in load() and implement _recognize(), which
+    raises speech_recognition.UnknownValueError when a chunk has no
+    recognizable speech, like recognize_google does. Calls are timed per
+    backend so throughput (seconds of audio recognized per second) can be
+    compared in the metrics.
+    """
+
+    name = None
+    # Whether several threads may recognize with the loaded model at once
+    thread_safe = True
+
+    def __init__(self, model_path=None, language=SPEECH_LANGUAGE):
+        self.model_path = model_path
+        self.language = language
+        self._lock = None if self.thread_safe else threading.Lock()
+
+    def load(self):
+        """Load the model, called once per process before the first recognition"""
+
+    def recognize(self, audio_data):
+        """Recognize one sr.AudioData chunk and return its text"""
+        audio_seconds = len(audio_data.frame_data) / (audio_data.sample_width * audio_data.sample_rate)
+        start = time.perf_counter()
+        try:
+            if self._lock is None:
+                return self._recognize(audio_data)
+            with self._lock:
+                return self._recognize(audio_data)
+        finally:
+            RECOGNITION_SECONDS.labels(backend=self.name).inc(time.perf_counter() - start)
+            RECOGNIZED_AUDIO_SECONDS.labels(backend=self.name).inc(audio_seconds)
+
+    def _recognize(self, audio_data):
+        raise NotImplementedError
+
+
+class GoogleBackend(SpeechBackend):
+    """Google's free web speech API, one HTTP request per chunk"""
+
+    name = 'google'
+
+    def load(self):
+        import speech_recognition as sr
+        self._recognizer = sr.Recognizer()
+
+    def _recognize(self, audio_data):
+        return self._recognizer.recognize_google(audio_data, language=self.language)
+
+
+class VoskBackend(SpeechBackend):
+    """Offline Kaldi models through vosk, the model is shared and each call gets its own recognizer"""
+
+    name = 'vosk'
+
+    def load(self):
+        try:
+            from vosk import Model, SetLogLevel
+        except ImportError:
+            raise RuntimeError("SPEECH_BACKEND=vosk needs the vosk package: pip install vosk")
+        if not self.model_path:
+            raise RuntimeError("SPEECH_BACKEND=vosk needs SPEECH_MODEL_PATH set to an unpacked model directory")
+        SetLogLevel(-1)
+        self._model = Model(self.model_path)
+
+    def _recognize(self, audio_data):
+        import speech_recognition as sr
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(self._model, audio_data.sample_rate)
+        recognizer.AcceptWaveform(audio_data.get_raw_data(convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get('text', '')
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class WhisperCppBackend(SpeechBackend):
+    """Offline whisper.cpp models through pywhispercpp, one recognition at a time per process"""
+
+    name = 'whisper_cpp'
+    # The model keeps its decoding state, and already uses WHISPER_THREADS cores per call
+    thread_safe = False
+
+    def load(self):
+        try:
+            from pywhispercpp.model import Model
+        except ImportError:
+            raise RuntimeError("SPEECH_BACKEND=whisper_cpp needs the pywhispercpp package: pip install pywhispercpp")
+        if not self.model_path:
+            raise RuntimeError("SPEECH_BACKEND=whisper_cpp needs SPEECH_MODEL_PATH set to a ggml model file or name")
+        self._model = Model(self.model_path, n_threads=WHISPER_THREADS,
+                            language=self.language.split('-')[0], print_progress=False, print_realtime=False)
+
+    def _recognize(self, audio_data):
+        import numpy as np
+        import speech_recognition as sr
+
+        # whisper.cpp takes 16 kHz float samples in [-1, 1]
+        raw = audio_data.get_raw_data(convert_rate=16000, convert_width=2)
+        samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
+        text = ' '.join(segment.text.strip() for segment in self._model.transcribe(samples)).strip()
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, VoskBackend, WhisperCppBackend)}
+
+# Fail at import, when a worker boots, rather than on the first upload
+if SPEECH_BACKEND not in BACKENDS:
+    raise ValueError(f"Unknown SPEECH_BACKEND {SPEECH_BACKEND!r}, expected one of {sorted(BACKENDS)}")
+
+
+def get_backend():
+    """
+    Return the configured speech backend, loading its model on first use
+
+    The backend is created once per process and shared by every request and
+    transcription thread, so a local model is only loaded into memory once
+    per gunicorn worker.
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if SPEECH_BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown SPEECH_BACKEND {SPEECH_BACKEND!r}, expected one of {sorted(BACKENDS)}")
+                backend = BACKENDS[SPEECH_BACKEND](SPEECH_MODEL_PATH)
+                start = time.perf_counter()
+                backend.load()
+                logger.info(f"Loaded speech backend {backend.name} in {time.perf_counter() - start:.2f}s")
+                _backend = backend
+    return _backend
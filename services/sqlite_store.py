@@ -0,0 +1,30 @@
+import sqlite3
+import contextlib
+
+# Seconds a connection waits for another process's write lock before failing
+BUSY_TIMEOUT = 5
+
+
+@contextlib.contextmanager
+def connect(path, schema):
+    """
+    Open a SQLite database shared by the worker processes
+
+    The table is created on first use. The transaction is committed when the
+    block succeeds, rolled back when it raises, and the connection is always
+    closed.
+
+    Args:
+        path: Database file
+        schema: CREATE TABLE IF NOT EXISTS statement of the table the caller uses
+
+    Yields:
+        sqlite3.Connection: The open connection
+    """
+    connection = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    try:
+        with connection:
+            connection.execute(schema)
+            yield connection
+    finally:
+        connection.close()
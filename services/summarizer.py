@@ -0,0 +1,103 @@
+import os
+import heapq
+import logging
+from collections import Counter
+from services.nlp_resources import get_stop_words, sent_tokenize, word_tokenize
+from services.text_analysis import TextAnalysis
+from services.metrics import time_step
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the number of sentences in a summary
+SUMMARY_MAX_SENTENCES = int(os.getenv('SUMMARY_MAX_SENTENCES', 40))
+# Candidate sentences kept per summary sentence while the transcript streams in
+CANDIDATE_FACTOR = 4
+
+
+class StreamingSummarizer:
+    """
+    Extractive summarizer fed transcript segments as they are recognized
+
+    Term frequencies are updated as segments arrive and only the best scoring
+    candidate sentences are kept in a bounded heap, so memory does not grow
+    with the length of the recording. Candidates are re-scored against the
+    current frequencies whenever the number of sentences seen doubles, and
+    once more when the summary is requested. A sentence scores the summed
+    frequency of its words divided by its length, and the top 30% of sentences
+    are kept in their original order.
+
+    Usage:
+        summarizer = StreamingSummarizer()
+        transcribe_audio(audio, on_segment=summarizer.add_segment)
+        summary = summarizer.summary()
+    """
+
+    def __init__(self, max_sentences=SUMMARY_MAX_SENTENCES):
+        self.max_sentences = max_sentences
+        self.candidate_limit = max_sentences * CANDIDATE_FACTOR
+        self.term_freq = Counter()
+        self.sentence_count = 0
+        self._stop_words = get_stop_words()
+        self._candidates = []  # min-heap of (score, -index, sentence, tokens), ties favour earlier sentences
+        self._head = []  # every sentence while there are too few to summarize
+        self._next_rescore = self.candidate_limit
+
+    def add_segment(self, text):
+        """Add one recognized transcript segment, segment ends are treated as sentence ends"""
+        if not text or not text.strip():
+            return
+        for sentence in sent_tokenize(text.strip()):
+            self._add_sentence(sentence)
+
+    @time_step('summarize')
+    def summary(self):
+        """
+        Build the summary of everything added so far
+
+        Returns:
+            TextAnalysis: Analysis of the summary, reusing the candidates' tokens
+        """
+        # Too short to summarize, return everything
+        if self.sentence_count <= 5:
+            return TextAnalysis(' '.join(sentence for sentence, _ in self._head),
+                                sentences=[sentence for sentence, _ in self._head],
+                                sentence_tokens=[tokens for _, tokens in self._head])
+
+        self._rescore()
+        num_sentences = min(self.max_sentences, max(3, int(self.sentence_count * 0.3)))
+        top = heapq.nlargest(num_sentences, self._candidates)
+        top.sort(key=lambda entry: -entry[1])
+        return TextAnalysis(
+            ' '.join(entry[2] for entry in top),
+            sentences=[entry[2] for entry in top],
+            sentence_tokens=[entry[3] for entry in top]
+        )
+
+    def _add_sentence(self, sentence):
+        tokens = word_tokenize(sentence.lower())
+        self.term_freq.update(word for word in tokens if word.isalnum() and word not in self._stop_words)
+
+        if self.sentence_count <= 5:
+            self._head.append((sentence, tokens))
+        elif self._head:
+            self._head = []
+
+        entry = (self._score(tokens), -self.sentence_count, sentence, tokens)
+        self.sentence_count += 1
+        if len(self._candidates) < self.candidate_limit:
+            heapq.heappush(self._candidates, entry)
+        elif entry > self._candidates[0]:
+            heapq.heapreplace(self._candidates, entry)
+
+        # Early scores were made with few counts, refresh them as the counts settle
+        if self.sentence_count >= self._next_rescore:
+            self._rescore()
+            self._next_rescore *= 2
+
+    def _score(self, tokens):
+        return sum(self.term_freq[word] for word in tokens if word in self.term_freq) / max(1, len(tokens))
+
+    def _rescore(self):
+        self._candidates = [(self._score(tokens), neg_index, sentence, tokens)
+                            for _, neg_index, sentence, tokens in self._candidates]
+        heapq.heapify(self._candidates)
@@ -0,0 +1,89 @@
+import heapq
+import logging
+from collections import Counter
+from itertools import chain, combinations
+
+logger = logging.getLogger(__name__)
+
+
+def count_ngrams(segments, max_n=3):
+    """
+    Count the 1- to max_n-grams of tokenized text in a single pass
+
+    Each segment (a sentence, a title, ...) is counted on its own so phrases
+    never span two segments.
+
+    Args:
+        segments: Iterable of token lists
+        max_n: Longest phrase length to count
+
+    Returns:
+        Counter: Occurrences keyed by token tuple
+    """
+    counts = Counter()
+    for tokens in segments:
+        # zip over shifted views yields every n-gram as a tuple without building strings
+        counts.update(chain.from_iterable(
+            zip(*(tokens[offset:] for offset in range(n))) for n in range(1, max_n + 1)
+        ))
+    return counts
+
+
+def select_tags(counts, max_tags=10):
+    """
+    Pick tag phrases from n-gram counts, longest phrases first, without near-duplicates
+
+    The most frequent trigrams, bigrams and unigrams are taken in proportion
+    to max_tags (3/5/10 for the default of 10). A candidate is dropped when its
+    words are a subset or superset of an already chosen tag, which is checked
+    against an index of token sets in constant time. Remaining slots are
+    filled with the top single words.
+
+    Args:
+        counts: Counter of token tuples, as returned by count_ngrams
+        max_tags: Number of tags to return
+
+    Returns:
+        list: Tags as token tuples
+    """
+    by_length = {1: [], 2: [], 3: []}
+    for gram, count in counts.items():
+        if len(gram) in by_length:
+            by_length[len(gram)].append((gram, count))
+
+    def top(n, k):
+        # nlargest is stable like FreqDist.most_common, ties keep first-seen order
+        return [gram for gram, _ in heapq.nlargest(k, by_length[n], key=lambda item: item[1])]
+
+    top_unigrams = top(1, max_tags)
+    candidates = top(3, max(1, max_tags * 3 // 10)) + top(2, max(1, max_tags // 2)) + top_unigrams
+
+    tags = []
+    chosen_sets = set()   # token sets of the chosen tags
+    covered_sets = set()  # every subset of a chosen tag's token set
+    for gram in candidates:
+        if len(tags) >= max_tags:
+            break
+        words = frozenset(gram)
+        subsets = _subsets(words)
+        # Skip phrases contained in a chosen tag or containing one
+        if words in covered_sets or not chosen_sets.isdisjoint(subsets):
+            continue
+        tags.append(gram)
+        chosen_sets.add(words)
+        covered_sets.update(subsets)
+
+    # Fill any remaining slots with single words if needed
+    chosen = set(tags)
+    for gram in top_unigrams:
+        if len(tags) >= max_tags:
+            break
+        if gram not in chosen:
+            tags.append(gram)
+            chosen.add(gram)
+
+    return tags
+
+
+def _subsets(words):
+    return [frozenset(subset) for size in range(1, len(words) + 1) for subset in combinations(words, size)]
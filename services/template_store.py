@@ -0,0 +1,125 @@
+import os
+import time
+import logging
+import tempfile
+import threading
+from services import sqlite_store
+
+logger = logging.getLogger(__name__)
+
+# SQLite file holding the description templates, shared by all worker processes
+STORE_PATH = os.getenv('TEMPLATE_STORE_PATH', os.path.join(tempfile.gettempdir(), 'description_templates.sqlite'))
+
+# Table of the templates
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS templates '
+    '(name TEXT PRIMARY KEY, text TEXT NOT NULL, version INTEGER NOT NULL, updated_at REAL NOT NULL)'
+)
+
+# Last template read per name: (file change counter, version, text)
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def seed_template(name, text):
+    """Store the initial text of a template unless a worker already stored one"""
+    try:
+        with _connect() as connection:
+            connection.execute(
+                'INSERT OR IGNORE INTO templates (name, text, version, updated_at) VALUES (?, ?, 1, ?)',
+                (name, text, time.time())
+            )
+    except Exception as e:
+        logger.warning(f"Could not seed template {name}: {e}")
+
+
+def get_template(name, fallback=''):
+    """
+    Return the current (version, text) of a template
+
+    Every worker keeps the last text it read, and only queries the database
+    again when the file change counter in the SQLite header moved. A request
+    therefore costs a 4-byte read, and an update made through any worker is
+    seen by all of them on their next request.
+
+    Args:
+        name: Template name
+        fallback: Text used while the store has no such template or cannot be read
+
+    Returns:
+        tuple: (version, text), version 0 for the fallback
+    """
+    counter = _change_counter()
+    with _loaded_lock:
+        loaded = _loaded.get(name)
+    if loaded is not None and counter is not None and loaded[0] == counter:
+        return loaded[1], loaded[2]
+
+    try:
+        with _connect() as connection:
+            row = connection.execute('SELECT version, text FROM templates WHERE name = ?', (name,)).fetchone()
+    except Exception as e:
+        logger.warning(f"Template store read failed: {e}")
+        row = None
+    if row is None:
+        return (loaded[1], loaded[2]) if loaded is not None else (0, fallback)
+
+    # The counter read before the query: a write in between increments it again, so it is picked up next time
+    with _loaded_lock:
+        _loaded[name] = (counter, row[0], row[1])
+    return row[0], row[1]
+
+
+def set_template(name, text):
+    """
+    Replace the text of a template and bump its version
+
+    Returns:
+        int: The new version
+    """
+    with _connect() as connection:
+        connection.execute(
+            'INSERT INTO templates (name, text, version, updated_at) VALUES (?, ?, 1, ?) '
+            'ON CONFLICT(name) DO UPDATE SET text = excluded.text, version = version + 1, '
+            'updated_at = excluded.updated_at',
+            (name, text, time.time())
+        )
+        version = connection.execute('SELECT version FROM templates WHERE name = ?', (name,)).fetchone()[0]
+    logger.info(f"Template {name} updated to version {version}")
+    return version
+
+
+def render_with_tags(name, tags, fallback=''):
+    """
+    Return the current template with one tag per line appended
+
+    The template comes from get_template, so a request only reads the store
+    when the template changed since this worker last read it.
+
+    Returns:
+        tuple: (version, rendered text)
+    """
+    version, text = get_template(name, fallback)
+    return version, text + ''.join(f"{tag}\n" for tag in tags)
+
+
+def _change_counter():
+    """
+    The file change counter of the database header (bytes 24-27)
+
+    SQLite increments it on every committed write in its default rollback
+    journal mode, which this store keeps, unlike size or mtime that a
+    same-size update in the same clock tick leaves unchanged.
+    """
+    try:
+        with open(STORE_PATH, 'rb') as f:
+            f.seek(24)
+            header = f.read(4)
+    except OSError:
+        return None
+    return header if len(header) == 4 else None
+
+
+def _connect():
+    """Open the template database"""
+    return sqlite_store.connect(STORE_PATH, SCHEMA)
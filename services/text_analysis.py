@@ -0,0 +1,53 @@
+import logging
+from services.nlp_resources import get_stop_words, sent_tokenize, word_tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class TextAnalysis:
+    """
+    Tokenization of a text, computed once and shared by every consumer of a request
+
+    Attributes:
+        text: The analysed text
+        sentences: Sentences of the text
+        sentence_tokens: Lowercase word tokens of each sentence
+        words: Lowercase word tokens of the whole text
+        filtered_words: Alphanumeric tokens that are not stopwords
+        word_freq: FreqDist of filtered_words
+    """
+
+    def __init__(self, text, sentences=None, sentence_tokens=None):
+        from nltk.probability import FreqDist
+
+        self.text = text
+        self.sentences = sent_tokenize(text) if sentences is None else sentences
+        if sentence_tokens is None:
+            sentence_tokens = [word_tokenize(sentence.lower()) for sentence in self.sentences]
+        self.sentence_tokens = sentence_tokens
+        self.words = [word for tokens in self.sentence_tokens for word in tokens]
+
+        stop_words = get_stop_words()
+        self.filtered_words = [word for word in self.words if word.isalnum() and word not in stop_words]
+        self.word_freq = FreqDist(self.filtered_words)
+
+    def top_keywords(self, count=20):
+        """The most frequent filtered words, most frequent first"""
+        return [word for word, _ in self.word_freq.most_common(count)]
+
+    def subset(self, indices):
+        """Analysis of the sentences at the given indices, reusing their tokens"""
+        sentences = [self.sentences[i] for i in indices]
+        return TextAnalysis(
+            ' '.join(sentences),
+            sentences=sentences,
+            sentence_tokens=[self.sentence_tokens[i] for i in indices]
+        )
+
+
+def get_analysis(text, analysis=None):
+    """Return the analysis passed in by the caller, or analyse the text"""
+    if analysis is not None:
+        return analysis
+    return TextAnalysis(text)
+
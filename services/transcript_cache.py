@@ -0,0 +1,97 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from services.metrics import record_cache_lookup
+
+logger = logging.getLogger(__name__)
+
+# Directory holding one JSON file per cached upload
+CACHE_DIR = os.getenv('TRANSCRIPT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'transcript_cache'))
+# Total size of the cache on disk before least recently used entries are evicted
+CACHE_MAX_BYTES = int(os.getenv('TRANSCRIPT_CACHE_MAX_BYTES', 100 * 1024 * 1024))
+# Maximum number of cached uploads
+CACHE_MAX_ENTRIES = int(os.getenv('TRANSCRIPT_CACHE_MAX_ENTRIES', 1000))
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file on disk, the key of its cache entry"""
+    content_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            content_hash.update(block)
+    return content_hash.hexdigest()
+
+
+def get_cached_content(content_hash):
+    """
+    Look up the transcript and summary stored for an upload
+
+    Args:
+        content_hash: SHA-256 hex digest of the uploaded file
+
+    Returns:
+        dict: The cached 'transcript' and 'summary', or None on a miss
+    """
+    path = _entry_path(content_hash)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path, None)
+        record_cache_lookup('transcript', True)
+        return entry
+    except FileNotFoundError:
+        record_cache_lookup('transcript', False)
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable transcript cache entry {path}: {e}")
+        return None
+
+
+def store_content(content_hash, transcript, summary):
+    """Store the transcript and summary for an upload, evicting old entries if needed"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        entry = {'transcript': transcript, 'summary': summary, 'created_at': time.time()}
+
+        # Write to a temporary file first so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, _entry_path(content_hash))
+
+        _evict()
+    except Exception as e:
+        logger.warning(f"Failed to store transcript cache entry: {e}")
+
+
+def _entry_path(content_hash):
+    if not content_hash or not all(c in '0123456789abcdef' for c in content_hash):
+        raise ValueError(f"Invalid content hash: {content_hash!r}")
+    return os.path.join(CACHE_DIR, f"{content_hash}.json")
+
+
+def _evict():
+    """Remove least recently used entries until the cache fits its limits"""
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            stat = os.stat(os.path.join(CACHE_DIR, name))
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+
+    total_bytes = sum(size for _, size, _ in entries)
+    entries.sort()
+    while entries and (len(entries) > CACHE_MAX_ENTRIES or total_bytes > CACHE_MAX_BYTES):
+        _, size, name = entries.pop(0)
+        try:
+            os.unlink(os.path.join(CACHE_DIR, name))
+            total_bytes -= size
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,149 @@
+import os
+import hashlib
+import logging
+import tempfile
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+
+logger = logging.getLogger(__name__)
+
+# Read size when copying a raw request body to disk
+INGEST_BUFFER_SIZE = 1024 * 1024
+
+
+class HashingFileWriter:
+    """
+    Temporary file that hashes and counts everything written to it
+
+    Werkzeug writes each uploaded file of a multipart request into one of
+    these while it parses the body, so the upload lands in its final location
+    with its SHA-256 already computed and is never copied again. Writing past
+    max_bytes raises RequestEntityTooLarge, which stops the upload as soon as
+    the limit is crossed.
+
+    The file is deleted on close unless claim() handed it over to the caller.
+    """
+
+    def __init__(self, directory=None, suffix='', max_bytes=None):
+        self._file = tempfile.NamedTemporaryFile(delete=False, dir=directory, suffix=suffix)
+        self._hash = hashlib.sha256()
+        self.name = self._file.name
+        self.max_bytes = max_bytes
+        self.bytes_written = 0
+        self._claimed = False
+
+    def write(self, data):
+        self.bytes_written += len(data)
+        if self.max_bytes is not None and self.bytes_written > self.max_bytes:
+            raise RequestEntityTooLarge(f"Upload exceeds the limit of {self.max_bytes} bytes")
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def readline(self, *args):
+        return self._file.readline(*args)
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        return self._file.flush()
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def claim(self):
+        """
+        Take ownership of the file, it is then kept when the request ends
+
+        Returns:
+            tuple: (path, sha256 hex digest, size in bytes)
+        """
+        self._file.close()
+        self._claimed = True
+        return self.name, self.hexdigest(), self.bytes_written
+
+    def close(self):
+        self._file.close()
+        if not self._claimed:
+            try:
+                os.unlink(self.name)
+            except OSError:
+                pass
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+
+class IngestRequest(Request):
+    """
+    Request class that streams uploaded files straight into HashingFileWriter temp files
+
+    Every writer created for the request is closed when the request ends, so
+    the temp file of an upload that was cut short (client disconnect,
+    truncated body, size limit) is removed even though werkzeug never wrapped
+    it in a FileStorage.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        writer = HashingFileWriter(
+            directory=current_app.config.get('UPLOAD_FOLDER'),
+            suffix=os.path.splitext(filename or '')[1],
+            max_bytes=self.max_content_length
+        )
+        self.__dict__.setdefault('_ingest_writers', []).append(writer)
+        return writer
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            # Claimed files are kept, close() only unlinks the others
+            for writer in self.__dict__.pop('_ingest_writers', []):
+                writer.close()
+
+
+def ingest_stream(stream, suffix='', max_bytes=None, directory=None):
+    """
+    Copy a raw upload body to a temporary file in large reads, hashing as it goes
+
+    Args:
+        stream: File-like object to read, e.g. request.stream
+        suffix: Extension of the temporary file
+        max_bytes: Size limit, exceeding it raises RequestEntityTooLarge
+        directory: Where to create the file, the system temp directory by default
+
+    Returns:
+        tuple: (path, sha256 hex digest, size in bytes)
+    """
+    writer = HashingFileWriter(directory=directory, suffix=suffix, max_bytes=max_bytes)
+    try:
+        for block in iter(lambda: stream.read(INGEST_BUFFER_SIZE), b''):
+            writer.write(block)
+    except BaseException:
+        writer.close()
+        raise
+    return writer.claim()
+
+
+def claim_upload(file_storage, max_bytes=None, directory=None):
+    """
+    Take over the file behind an uploaded FileStorage without copying it when possible
+
+    Files parsed by IngestRequest are already on disk and hashed. Anything
+    else (e.g. a request built by another Request class) is streamed to disk
+    with ingest_stream.
+
+    Returns:
+        tuple: (path, sha256 hex digest, size in bytes)
+    """
+    if isinstance(file_storage.stream, HashingFileWriter):
+        return file_storage.stream.claim()
+    suffix = os.path.splitext(file_storage.filename or '')[1]
+    return ingest_stream(file_storage.stream, suffix=suffix, max_bytes=max_bytes, directory=directory)
@@ -0,0 +1,263 @@
+import os
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+import contextlib
+from werkzeug.utils import secure_filename
+from services.metrics import UPLOADED_BYTES
+
+try:
+    import fcntl
+except ImportError:  # Windows, sessions are then only safe within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Directory holding the partially uploaded files and their manifests
+SESSION_DIR = os.getenv('UPLOAD_SESSION_DIR', os.path.join(tempfile.gettempdir(), 'video_chunks'))
+# Seconds an unfinished upload session is kept before it is removed
+SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 24 * 3600))
+# Buffer used to copy a chunk from the request into the target file
+COPY_BUFFER_SIZE = 1024 * 1024
+
+_local_lock = threading.Lock()
+
+
+class UploadSessionError(Exception):
+    """Raised for chunks that do not fit the upload session"""
+
+
+def create_session(filename, total_chunks, chunk_size=None, total_size=None, session_id=None, restart=False):
+    """
+    Start a chunked upload, or return the unfinished session with the same id
+
+    An id whose previous upload already completed, or whose unfinished upload
+    was declared with a different total_chunks, chunk_size or total_size,
+    starts a new session.
+
+    When total_size is known the target file is preallocated so chunks can be
+    written at their offsets in any order.
+
+    Args:
+        filename: Original name of the uploaded file
+        total_chunks: Number of chunks the client will send
+        chunk_size: Size of every chunk except the last one, learned from the
+            first non-final chunk when not given
+        total_size: Size of the complete file, if known
+        session_id: Client chosen id, a random one is generated when missing
+        restart: Discard an unfinished session with the same id instead of resuming it
+
+    Returns:
+        dict: The session manifest
+    """
+    session_id = secure_filename(session_id or uuid.uuid4().hex)
+    if not session_id:
+        raise UploadSessionError("Invalid session id")
+    if total_chunks < 1:
+        raise UploadSessionError("total_chunks must be at least 1")
+
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    _prune_expired_sessions()
+
+    with _session_lock(session_id):
+        manifest = _read_manifest(session_id)
+        if manifest is not None and manifest['status'] == 'uploading':
+            declared = {'total_chunks': total_chunks, 'chunk_size': chunk_size, 'total_size': total_size}
+            changed = [key for key, value in declared.items() if value is not None and value != manifest[key]]
+            if not restart and not changed:
+                return manifest
+            logger.info(f"Restarting upload session {session_id}"
+                        + (f", {', '.join(changed)} changed" if changed else ""))
+
+        manifest = {
+            'session_id': session_id,
+            'filename': filename,
+            'total_chunks': total_chunks,
+            'chunk_size': chunk_size,
+            'total_size': total_size,
+            'received': [],
+            'end': 0,
+            'status': 'uploading',
+            'job_id': None,
+            'created_at': time.time(),
+        }
+        with open(_data_path(session_id), 'wb') as f:
+            if total_size:
+                _preallocate(f, total_size)
+        _write_manifest(manifest)
+        logger.info(f"Created upload session {session_id} for {filename} ({total_chunks} chunks)")
+        return manifest
+
+
+def get_session(session_id):
+    """Return the manifest of an upload session, or None if it does not exist"""
+    return _read_manifest(secure_filename(session_id))
+
+
+def write_chunk(session_id, chunk_number, stream):
+    """
+    Write one chunk straight into the target file at its offset
+
+    Chunks may arrive in any order, concurrently and more than once (a resent
+    chunk simply overwrites itself).
+
+    Args:
+        session_id: Id of the upload session
+        chunk_number: Zero-based index of the chunk
+        stream: File-like object the chunk is read from
+
+    Returns:
+        tuple: (manifest, path) where path is the completed file when this
+            chunk finished the upload and None otherwise
+    """
+    session_id = secure_filename(session_id)
+    manifest = _read_manifest(session_id)
+    if manifest is None:
+        raise UploadSessionError(f"Unknown upload session: {session_id}")
+    if manifest['status'] != 'uploading':
+        raise UploadSessionError(f"Upload session {session_id} is already {manifest['status']}")
+    if not 0 <= chunk_number < manifest['total_chunks']:
+        raise UploadSessionError(f"Chunk {chunk_number} is out of range for {manifest['total_chunks']} chunks")
+
+    is_last = chunk_number == manifest['total_chunks'] - 1
+    chunk_size = manifest['chunk_size']
+    if chunk_size is None and chunk_number > 0:
+        raise UploadSessionError("chunk_size is required before chunks other than the first can be placed")
+    offset = chunk_number * chunk_size if chunk_number else 0
+    total_size = manifest['total_size']
+    if total_size and offset >= total_size:
+        raise UploadSessionError(f"Chunk {chunk_number} starts past the declared total size")
+
+    # Bytes this chunk may take, checked before each write so a chunk never spills into the next one's slot
+    if not is_last and chunk_size is not None:
+        limit = chunk_size
+    elif total_size:
+        limit = total_size - offset
+    else:
+        limit = None
+
+    # Copy with a large buffer, the chunk is never held in memory as a whole
+    written = 0
+    with open(_data_path(session_id), 'r+b') as f:
+        f.seek(offset)
+        while True:
+            data = stream.read(COPY_BUFFER_SIZE)
+            if not data:
+                break
+            if limit is not None and written + len(data) > limit:
+                raise UploadSessionError(f"Chunk {chunk_number} is larger than the {limit} bytes expected")
+            f.write(data)
+            written += len(data)
+
+    UPLOADED_BYTES.labels(route='chunk_upload').inc(written)
+    if not is_last and chunk_size is not None and written != chunk_size:
+        raise UploadSessionError(f"Chunk {chunk_number} has {written} bytes, expected {chunk_size}")
+    if is_last and total_size and offset + written != total_size:
+        raise UploadSessionError(f"Chunk {chunk_number} has {written} bytes, expected {total_size - offset}")
+
+    with _session_lock(session_id):
+        manifest = _read_manifest(session_id)
+        if chunk_size is None and not is_last:
+            # Another request may have set the size meanwhile, the chunks must agree on it
+            if manifest['chunk_size'] not in (None, written):
+                raise UploadSessionError(f"Chunk {chunk_number} has {written} bytes, expected {manifest['chunk_size']}")
+            manifest['chunk_size'] = written
+        if chunk_number not in manifest['received']:
+            manifest['received'].append(chunk_number)
+        manifest['end'] = max(manifest['end'], offset + written)
+
+        # Only the request that completes the upload gets the path back
+        completed_path = None
+        if manifest['status'] == 'uploading' and len(manifest['received']) == manifest['total_chunks']:
+            completed_path = _finish(manifest)
+        _write_manifest(manifest)
+
+    return manifest, completed_path
+
+
+def mark_session(session_id, **fields):
+    """Update fields of a session manifest, e.g. the job processing the file"""
+    with _session_lock(session_id):
+        manifest = _read_manifest(session_id)
+        if manifest is not None:
+            manifest.update(fields)
+            _write_manifest(manifest)
+
+
+def _finish(manifest):
+    """Trim the target file and move it out of the session directory, caller holds the lock"""
+    session_id = manifest['session_id']
+    if manifest['total_size'] and manifest['end'] != manifest['total_size']:
+        raise UploadSessionError(f"Received {manifest['end']} of {manifest['total_size']} bytes")
+    data_path = _data_path(session_id)
+    with open(data_path, 'r+b') as f:
+        f.truncate(manifest['total_size'] or manifest['end'])
+
+    extension = os.path.splitext(secure_filename(manifest['filename']))[1]
+    final_path = os.path.join(SESSION_DIR, f"{session_id}-{uuid.uuid4().hex[:8]}{extension}")
+    os.replace(data_path, final_path)
+    manifest['status'] = 'complete'
+    manifest['completed_at'] = time.time()
+    logger.info(f"Upload session {session_id} complete: {manifest['end']} bytes")
+    return final_path
+
+
+def _preallocate(f, size):
+    try:
+        os.posix_fallocate(f.fileno(), 0, size)
+    except (AttributeError, OSError):
+        # Not supported by the platform or filesystem, a sparse file works as well
+        f.truncate(size)
+
+
+def _prune_expired_sessions():
+    cutoff = time.time() - SESSION_TTL
+    for name in os.listdir(SESSION_DIR):
+        path = os.path.join(SESSION_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except OSError:
+            pass
+
+
+def _data_path(session_id):
+    return os.path.join(SESSION_DIR, f"{session_id}.part")
+
+
+def _manifest_path(session_id):
+    return os.path.join(SESSION_DIR, f"{session_id}.json")
+
+
+def _read_manifest(session_id):
+    try:
+        with open(_manifest_path(session_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(manifest):
+    path = _manifest_path(manifest['session_id'])
+    temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, path)
+
+
+@contextlib.contextmanager
+def _session_lock(session_id):
+    """Serialize manifest updates across threads and worker processes"""
+    with _local_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(SESSION_DIR, f"{session_id}.lock"), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
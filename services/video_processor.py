@@ -1,151 +1,263 @@
 import os
-import tempfile
+import time
+import shutil
+import subprocess
 import logging
-import speech_recognition as sr
-from pydub import AudioSegment
-from moviepy.editor import VideoFileClip
-import nltk
-from nltk.tokenize import sent_tokenize
-from nltk.corpus import stopwords
-from nltk.probability import FreqDist
-from nltk.tokenize import word_tokenize
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from services.metrics import time_step, TRANSCRIBED_CHUNKS, RECOGNIZER_FAILURES
+from services.pipeline import record_stage_metric
+from services.speech_backends import get_backend
 
 logger = logging.getLogger(__name__)
 
-def extract_video_content(video_path):
+# Sample rate audio is decoded at, what the speech recognizers expect
+PCM_SAMPLE_RATE = 16000
+# Longest audio window sent to the recognizer, in seconds
+CHUNK_DURATION = 30
+# Skip silence and cut on pauses instead of fixed CHUNK_DURATION windows
+VAD_ENABLED = os.getenv('VAD_ENABLED', 'true').lower() in {'1', 'true', 'yes'}
+# Number of chunks a single transcription recognizes in parallel
+TRANSCRIBE_WORKERS = int(os.getenv('TRANSCRIBE_WORKERS', 4))
+# Upper bound on recognizer calls in flight across all requests in this process
+MAX_CONCURRENT_RECOGNITIONS = int(os.getenv('MAX_CONCURRENT_RECOGNITIONS', 8))
+
+# Returned by transcribe_audio in place of a transcript when recognition fails
+TRANSCRIPTION_FAILED_MESSAGE = "Unable to transcribe audio. The video may not contain clear speech or may be too long."
+
+_recognition_slots = threading.BoundedSemaphore(MAX_CONCURRENT_RECOGNITIONS)
+# Returned by _transcribe_chunk when the recognizer failed, as opposed to finding no speech
+_RECOGNITION_ERROR = object()
+
+def extract_video_transcript(video_path, recognize=None, on_segment=None, on_progress=None, media=None):
     """
-    Extract content from video file using speech recognition
+    Decode the audio of a video and transcribe it
     
     Args:
         video_path: Path to the video file
+        recognize: Optional recognizer callable passed to transcribe_audio
+        on_segment: Optional callable passed to transcribe_audio
+        on_progress: Optional callable receiving (event, data) once the audio is
+            decoded ('audio_extracted') and from transcribe_audio
+        media: Optional preflight result, selects the audio stream and the windows to decode
         
     Returns:
-        str: Summary of the video content
+        tuple: (transcript, failed_chunks) as returned by transcribe_audio
     """
-    try:
-        # Extract audio from video
-        audio_path = extract_audio(video_path)
-        
-        # Transcribe audio
-        transcript = transcribe_audio(audio_path)
-        
-        # Clean up temporary audio file
-        os.remove(audio_path)
-        
-        # Summarize transcript with NLTK
-        summary = summarize_with_nltk(transcript)
+    media = media or {}
+    # Decode the audio track straight into memory
+    audio_data = extract_audio_pcm(video_path, stream_index=media.get('audio_stream'), windows=media.get('windows'))
+    if on_progress is not None:
+        on_progress('audio_extracted', {
+            'audio_seconds': round(len(audio_data.frame_data) / (audio_data.sample_width * audio_data.sample_rate), 1),
+            'strategy': media.get('strategy')
+        })
+    
+    # Transcribe audio
+    return transcribe_audio(audio_data, recognize=recognize, on_segment=on_segment, on_progress=on_progress)
+
+@time_step('extract_audio')
+def extract_audio_pcm(video_path, sample_rate=PCM_SAMPLE_RATE, stream_index=None, windows=None):
+    """
+    Decode the audio track of a video as 16-bit mono PCM through an ffmpeg pipe
+    
+    Only the audio stream is decoded and it is resampled to the recognizer's
+    native rate, so no video decoder is started and no WAV file is written.
+    
+    Args:
+        video_path: Path to the video file
+        sample_rate: Output sample rate in Hz
+        stream_index: Optional index of the audio stream to decode, ffmpeg's choice by default
+        windows: Optional (start, seconds) ranges to decode instead of the whole track; ffmpeg
+            seeks to each one, and they are joined with a second of silence so no chunk spans two
         
-        return summary
-    except Exception as e:
-        logger.exception(f"Error processing video: {e}")
-        raise
+    Returns:
+        sr.AudioData: The decoded audio
+    """
+    import speech_recognition as sr
+    
+    if not windows:
+        parts = [_decode_pcm(video_path, sample_rate, stream_index)]
+    else:
+        parts = [_decode_pcm(video_path, sample_rate, stream_index, start, seconds) for start, seconds in windows]
+    
+    if not any(parts):
+        raise RuntimeError("Could not extract audio: the video has no audio track")
+    
+    return sr.AudioData(bytes(2 * sample_rate).join(part for part in parts if part), sample_rate, 2)
 
-def extract_audio(video_path):
-    """Extract audio from video file"""
+def _decode_pcm(video_path, sample_rate, stream_index=None, start=None, seconds=None):
+    """Run ffmpeg over the whole input or one window of it and return the raw samples"""
+    # -ss before -i seeks in the container, so the audio before the window is not decoded
+    window = ['-ss', str(max(0, start)), '-t', str(seconds)] if start is not None else []
+    stream = ['-map', f'0:{stream_index}'] if stream_index is not None else []
+    command = [
+        get_ffmpeg_binary(), '-nostdin', '-v', 'error',
+        *window,
+        '-i', video_path,
+        *stream,
+        '-vn', '-sn', '-dn',
+        '-ac', '1', '-ar', str(sample_rate),
+        '-f', 's16le', '-acodec', 'pcm_s16le',
+        'pipe:1'
+    ]
     try:
-        # Create temporary file for audio
-        temp_audio = tempfile.mktemp(suffix=".wav")
-        
-        # Extract audio using moviepy
-        video = VideoFileClip(video_path)
-        video.audio.write_audiofile(temp_audio, logger=None)
-        
-        return temp_audio
+        process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
     except Exception as e:
         logger.exception(f"Error extracting audio: {e}")
         raise
+    
+    if process.returncode != 0:
+        error_output = process.stderr.decode('utf-8', errors='replace').strip()
+        logger.error(f"ffmpeg failed to extract audio from {video_path}: {error_output}")
+        raise RuntimeError(f"Could not extract audio: {error_output[-500:] or 'ffmpeg exited with ' + str(process.returncode)}")
+    
+    return process.stdout
 
-def transcribe_audio(audio_path):
-    """Transcribe audio file to text using Google's free speech recognition"""
-    try:
-        # Use Google's free speech recognition
-        recognizer = sr.Recognizer()
-        audio_file = sr.AudioFile(audio_path)
-        
-        # Process in chunks to handle longer files
-        transcript = ""
-        with audio_file as source:
-            # Adjust for ambient noise
-            recognizer.adjust_for_ambient_noise(source)
-            
-            # Calculate audio length
-            audio_length = source.DURATION
-            if audio_length is None:
-                # If duration is not available, process the whole file
-                audio_data = recognizer.record(source)
-                transcript = recognizer.recognize_google(audio_data)
-            else:
-                # Process in 30-second chunks
-                chunk_duration = 30  # seconds
-                offset = 0
-                
-                while offset < audio_length:
-                    chunk_data = recognizer.record(source, duration=min(chunk_duration, audio_length - offset))
-                    try:
-                        chunk_text = recognizer.recognize_google(chunk_data)
-                        transcript += " " + chunk_text
-                    except sr.UnknownValueError:
-                        # Speech wasn't understandable
-                        pass
-                    except Exception as e:
-                        logger.error(f"Error in transcription chunk: {e}")
-                    
-                    offset += chunk_duration
-        
-        return transcript
-    except Exception as e:
-        logger.exception(f"Error with speech recognition: {e}")
-        return "Unable to transcribe audio. The video may not contain clear speech or may be too long."
+def get_ffmpeg_binary():
+    """Locate ffmpeg, preferring FFMPEG_BINARY, then PATH, then the copy bundled for moviepy"""
+    binary = os.getenv('FFMPEG_BINARY') or shutil.which('ffmpeg')
+    if binary:
+        return binary
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
 
-def summarize_with_nltk(transcript):
-    """Summarize transcript using NLTK extractive summarization"""
-    try:
-        # Download NLTK resources if not already downloaded
-        try:
-            nltk.data.find('tokenizers/punkt')
-        except LookupError:
-            nltk.download('punkt')
-        
-        try:
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('stopwords')
-        
-        # Tokenize the transcript into sentences
-        sentences = sent_tokenize(transcript)
-        
-        # Skip summarization if transcript is too short
-        if len(sentences) <= 5:
-            return transcript
+def transcribe_audio(audio, recognize=None, max_workers=None, on_segment=None, on_progress=None):
+    """
+    Transcribe audio file to text with the configured speech backend
+    
+    The decoded audio is segmented on pauses and only the segments that
+    contain speech are sent to the recognizer. Segments are recognized
+    concurrently on a bounded thread pool and joined back in offset order.
+    The backend and its throughput are recorded as stage metrics.
+    
+    Args:
+        audio: sr.AudioData with the decoded audio, or a path to a WAV file
+        recognize: Optional callable taking an sr.AudioData and returning its text,
+            defaults to the SPEECH_BACKEND recognizer (Google's free speech API by default)
+        max_workers: Number of segments recognized in parallel, defaults to TRANSCRIBE_WORKERS
+        on_segment: Optional callable receiving the text of each recognized segment,
+            in offset order, as soon as it and all earlier segments are done
+        on_progress: Optional callable receiving ('chunk_transcribed', data) after each
+            segment, with data holding the chunk number and the total number of chunks
         
-        # Tokenize words and remove stopwords
-        stop_words = set(stopwords.words('english'))
-        words = word_tokenize(transcript.lower())
-        filtered_words = [word for word in words if word.isalnum() and word not in stop_words]
+    Returns:
+        tuple: (transcript, failed_chunks) where failed_chunks counts the segments the
+            recognizer raised an error for, so a partial transcript can be told apart from
+            a complete one. The transcript is TRANSCRIPTION_FAILED_MESSAGE when nothing at
+            all could be recognized.
+    
+    Raises:
+        ValueError, RuntimeError: The configured speech backend is unknown or cannot be loaded
+    """
+    # A misconfigured backend fails the request instead of passing for a video without speech
+    backend_name = 'custom'
+    if recognize is None:
+        backend = get_backend()
+        recognize, backend_name = backend.recognize, backend.name
+    
+    try:
+        import speech_recognition as sr
         
-        # Get word frequency
-        word_freq = FreqDist(filtered_words)
+        if isinstance(audio, sr.AudioData):
+            audio_data = audio
+        else:
+            with sr.AudioFile(audio) as source:
+                audio_data = sr.Recognizer().record(source)
         
-        # Score sentences based on word frequency
-        sentence_scores = {}
-        for i, sentence in enumerate(sentences):
-            sentence_words = word_tokenize(sentence.lower())
-            score = sum([word_freq[word] for word in sentence_words if word in word_freq])
-            # Normalize by sentence length
-            sentence_scores[i] = score / max(1, len(sentence_words))
+        chunks = split_audio(audio_data)
+        if not chunks:
+            return "", 0
+        started = time.perf_counter()
         
-        # Select top 30% of sentences
-        num_sentences = max(3, int(len(sentences) * 0.3))
-        top_sentences = sorted(sentence_scores.items(), key=lambda x: x[1], reverse=True)[:num_sentences]
+        # Recognize chunks concurrently, map() yields the results in offset order
+        workers = max(1, min(max_workers or TRANSCRIBE_WORKERS, len(chunks)))
+        chunk_texts = []
+        errors = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='transcribe') as executor:
+            results = executor.map(lambda chunk: _transcribe_chunk(recognize, chunk), chunks)
+            for number, text in enumerate(results, start=1):
+                if on_progress is not None:
+                    on_progress('chunk_transcribed', {'chunk': number, 'total_chunks': len(chunks)})
+                if text is _RECOGNITION_ERROR:
+                    errors += 1
+                    continue
+                if not text:
+                    continue
+                chunk_texts.append(text)
+                if on_segment is not None:
+                    on_segment(text)
         
-        # Sort sentences by original order
-        top_sentences = sorted(top_sentences, key=lambda x: x[0])
+        elapsed = time.perf_counter() - started
+        speech_seconds = sum(len(chunk.frame_data) for chunk in chunks) / (audio_data.sample_width * audio_data.sample_rate)
+        record_stage_metric('speech_backend', backend_name)
+        record_stage_metric('speech_seconds', round(speech_seconds, 1))
+        record_stage_metric('speech_seconds_per_second', round(speech_seconds / elapsed, 2) if elapsed else None)
         
-        # Combine sentences to form summary
-        summary = ' '.join([sentences[i] for i, _ in top_sentences])
+        if errors and not chunk_texts:
+            # Every chunk failed (network down, quota, ...), not a video without speech
+            logger.error(f"Speech recognition failed for {errors} of {len(chunks)} chunks and recognized nothing")
+            return TRANSCRIPTION_FAILED_MESSAGE, errors
+        if errors:
+            logger.warning(f"Speech recognition failed for {errors} of {len(chunks)} chunks, the transcript is incomplete")
+        return "".join(" " + text for text in chunk_texts), errors
+    except Exception as e:
+        logger.exception(f"Error with speech recognition: {e}")
+        return TRANSCRIPTION_FAILED_MESSAGE, 0
+
+def split_audio(audio_data):
+    """
+    Split decoded audio into the chunks that will be sent to the recognizer
+    
+    With VAD_ENABLED (the default) only speech regions are kept and cuts fall
+    on pauses, otherwise the audio is cut into fixed CHUNK_DURATION windows.
+    
+    Args:
+        audio_data: sr.AudioData holding the whole recording
         
-        return summary
+    Returns:
+        list: sr.AudioData chunks in playback order
+    """
+    import numpy as np
+    import speech_recognition as sr
+    from services.audio_segmentation import find_speech_segments, fixed_segments, joiner_samples
+    
+    sample_rate = audio_data.sample_rate
+    pcm = audio_data.get_raw_data(convert_width=2)
+    samples = np.frombuffer(pcm, dtype='<i2')
+    
+    if VAD_ENABLED:
+        segments = find_speech_segments(samples, sample_rate, CHUNK_DURATION)
+    else:
+        segments = fixed_segments(len(samples), sample_rate, CHUNK_DURATION)
+    
+    total_seconds = len(samples) / float(sample_rate)
+    speech_seconds = sum(end - start for segment in segments for start, end in segment) / float(sample_rate)
+    logger.info(f"Sending {len(segments)} segments ({speech_seconds:.1f}s of {total_seconds:.1f}s audio) to the recognizer")
+    
+    # The speech regions of a segment are joined by a short silence instead of the pauses between them
+    joiner = bytes(2 * joiner_samples(sample_rate))
+    return [sr.AudioData(joiner.join(pcm[start * 2:end * 2] for start, end in segment), sample_rate, 2)
+            for segment in segments]
+
+def _transcribe_chunk(recognize, chunk_data):
+    """Recognize a single chunk, returning None when it has no usable speech and _RECOGNITION_ERROR when the recognizer failed"""
+    import speech_recognition as sr
+    
+    TRANSCRIBED_CHUNKS.inc()
+    try:
+        with time_step('transcribe_chunk'):
+            return _recognize_with_limit(recognize, chunk_data)
+    except sr.UnknownValueError:
+        # Speech wasn't understandable
+        RECOGNIZER_FAILURES.labels(reason='unintelligible').inc()
+        return None
     except Exception as e:
-        logger.exception(f"Error summarizing with NLTK: {e}")
-        # Return a portion of the transcript if summarization fails
-        return transcript[:500] + "..." if len(transcript) > 500 else transcript 
\ No newline at end of file
+        logger.error(f"Error in transcription chunk: {e}")
+        RECOGNIZER_FAILURES.labels(reason='error').inc()
+        return _RECOGNITION_ERROR
+
+def _recognize_with_limit(recognize, audio_data):
+    """Call the recognizer while holding one of the per-process recognition slots"""
+    with _recognition_slots:
+        return recognize(audio_data)
@@ -55,6 +55,8 @@ def main():
     print("1. Edit the .env file to add your API keys")
     print("2. Run 'python app.py'")
     print("3. Open your browser to http://localhost:5000")
+    print("\nTo process a folder of existing videos without the web server:")
+    print("   python batch_process.py path/to/videos --output results.jsonl")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,99 @@
+import io
+import os
+
+import pytest
+
+from services import upload_sessions
+from services.upload_sessions import UploadSessionError, create_session, get_session, write_chunk
+
+
+@pytest.fixture(autouse=True)
+def session_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_sessions, 'SESSION_DIR', str(tmp_path))
+    return tmp_path
+
+
+def send(session_id, chunk_number, data):
+    return write_chunk(session_id, chunk_number, io.BytesIO(data))
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_out_of_order_chunks_assemble_in_place():
+    create_session('video.mp4', 3, chunk_size=4, total_size=10, session_id='s1')
+    assert send('s1', 2, b'CC') == (get_session('s1'), None)
+    assert send('s1', 0, b'AAAA')[1] is None
+    manifest, path = send('s1', 1, b'BBBB')
+    assert manifest['status'] == 'complete'
+    assert read(path) == b'AAAABBBBCC'
+
+
+def test_duplicate_chunk_overwrites_itself():
+    create_session('video.mp4', 2, chunk_size=4, total_size=6, session_id='s1')
+    send('s1', 0, b'AAAA')
+    manifest, path = send('s1', 0, b'aaaa')
+    assert path is None
+    assert manifest['received'] == [0]
+    _, path = send('s1', 1, b'BB')
+    assert read(path) == b'aaaaBB'
+
+
+def test_oversized_chunk_is_rejected_without_touching_the_next_chunk():
+    create_session('video.mp4', 3, chunk_size=4, total_size=10, session_id='s1')
+    send('s1', 2, b'CC')
+    with pytest.raises(UploadSessionError):
+        send('s1', 1, b'BBBBXX')
+    assert get_session('s1')['received'] == [2]
+    send('s1', 1, b'BBBB')
+    _, path = send('s1', 0, b'AAAA')
+    assert read(path) == b'AAAABBBBCC'
+
+
+def test_oversized_last_chunk_is_rejected():
+    create_session('video.mp4', 2, chunk_size=4, total_size=6, session_id='s1')
+    with pytest.raises(UploadSessionError):
+        send('s1', 1, b'BBB')
+
+
+def test_short_chunks_are_rejected():
+    create_session('video.mp4', 2, chunk_size=4, total_size=8, session_id='s1')
+    with pytest.raises(UploadSessionError):
+        send('s1', 0, b'AA')
+    send('s1', 0, b'AAAA')
+    with pytest.raises(UploadSessionError):
+        send('s1', 1, b'B')
+    manifest = get_session('s1')
+    assert manifest['status'] == 'uploading'
+    assert manifest['received'] == [0]
+
+
+def test_learned_chunk_size_limits_later_chunks():
+    create_session('video.mp4', 3, session_id='s1')
+    send('s1', 0, b'AAAA')
+    assert get_session('s1')['chunk_size'] == 4
+    with pytest.raises(UploadSessionError):
+        send('s1', 1, b'BBBBXX')
+    send('s1', 1, b'BBBB')
+    _, path = send('s1', 2, b'CC')
+    assert read(path) == b'AAAABBBBCC'
+    assert not os.path.exists(upload_sessions._data_path('s1'))
+
+
+def test_changed_declaration_restarts_the_session():
+    create_session('video.mp4', 3, chunk_size=4, total_size=10, session_id='s1')
+    send('s1', 2, b'CC')
+    assert create_session('video.mp4', 3, chunk_size=4, total_size=10, session_id='s1')['received'] == [2]
+    manifest = create_session('video.mp4', 2, chunk_size=4, total_size=6, session_id='s1')
+    assert manifest['received'] == []
+    send('s1', 0, b'AAAA')
+    _, path = send('s1', 1, b'BB')
+    assert read(path) == b'AAAABB'
+
+
+def test_restart_discards_an_unfinished_session():
+    create_session('video.mp4', 2, chunk_size=4, total_size=6, session_id='s1')
+    send('s1', 1, b'BB')
+    assert create_session('video.mp4', 2, session_id='s1', restart=True)['received'] == []